@@ -6,14 +6,16 @@ import uuid
 
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 import numpy as np
+import orjson
 
 from services.audio import (
-    AudioProcessor,
     DebugAudioWriter,
+    ResampleState,
     append_debug_audio_samples,
     close_debug_audio_writer,
     is_debug_audio_enabled,
 )
+from services.schemas import Segment
 from services.storage import StorageManager
 from services.inference import (
     ASRInferenceService,
@@ -27,6 +29,18 @@ from core.config import settings
 from core.context import connection_id_ctx, session_id_ctx
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# Preprocessed chunks allowed to wait for inference before receiving pauses.
+AUDIO_PIPELINE_DEPTH = 4
+# User ID recorded for sessions created by WebSocket clients.
+WEBSOCKET_USER_ID = "websocket_client"
+
+
+async def _cancel_task(task: asyncio.Task) -> None:
+    """Cancel a task and wait for it to finish, ignoring its outcome."""
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
 
 
 async def _append_debug_audio(
@@ -59,12 +73,99 @@ async def _close_debug_audio_writer(
         close_ctx = contextvars.copy_context()
         await loop.run_in_executor(None, close_ctx.run, close_debug_audio_writer, writer)
     except Exception as exc:
-        logging.error(f"[WebSocket] Failed to close debug audio writer: {exc}")
+        logger.error("[WebSocket] Failed to close debug audio writer: %s", exc)
+
+
+async def _send_event(websocket: WebSocket, event: dict[str, object]) -> None:
+    """Serialize an event with orjson and send it as a text frame."""
+    await websocket.send_text(orjson.dumps(event).decode())
+
+
+def _coalesce_partials(events: list[dict[str, object]]) -> list[dict[str, object]]:
+    """Drop partials superseded by a newer partial for the same sequence.
+
+    Each partial carries the full current hypothesis for its sequence, so
+    only the latest queued one needs to reach the client. Finals and partials
+    for other sequences are kept in order.
+
+    Args:
+        events: Queued outbound events in send order.
+
+    Returns:
+        The events that still need to be sent, in order.
+    """
+    coalesced: list[dict[str, object]] = []
+    for event in events:
+        if (
+            coalesced
+            and event["type"] == "partial"
+            and coalesced[-1]["type"] == "partial"
+            and coalesced[-1]["seq"] == event["seq"]
+        ):
+            coalesced[-1] = event
+        else:
+            coalesced.append(event)
+    return coalesced
+
+
+class OutboundEventPump:
+    """Send transcription events to a WebSocket from a background task.
+
+    The receive/inference loop enqueues events without waiting on socket
+    writes. Whatever has queued up while a send was in flight is drained in
+    one pass, with superseded partials dropped.
+    """
+
+    def __init__(self, websocket: WebSocket) -> None:
+        """Start the pump for one connection.
+
+        Args:
+            websocket: The accepted WebSocket connection.
+        """
+        self._send_text = websocket.send_text
+        self._queue: asyncio.Queue[dict[str, object] | None] = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    def put(self, event: dict[str, object]) -> None:
+        """Queue an event for sending.
+
+        Raises:
+            Exception: The error that stopped the pump, if a send failed.
+        """
+        if self._task.done():
+            self._task.result()
+            raise RuntimeError("Outbound event pump is closed.")
+        self._queue.put_nowait(event)
+
+    async def close(self) -> None:
+        """Flush queued events and stop the pump."""
+        if not self._task.done():
+            self._queue.put_nowait(None)
+        await self._task
+
+    async def abort(self) -> None:
+        """Stop the pump without flushing queued events."""
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+
+    async def _run(self) -> None:
+        """Drain the queue and send events until closed."""
+        while True:
+            events = [await self._queue.get()]
+            while not self._queue.empty():
+                events.append(self._queue.get_nowait())
+
+            stop = None in events
+            pending = [event for event in events if event is not None]
+            for event in _coalesce_partials(pending):
+                await self._send_text(orjson.dumps(event).decode())
+            if stop:
+                return
 
 
 async def _send_inference_overload_error(websocket: WebSocket) -> None:
     """Send an inference overload event and close the WebSocket."""
-    await websocket.send_json({
+    await _send_event(websocket, {
         "type": "error",
         "code": INFERENCE_OVERLOAD_ERROR_CODE,
         "message": INFERENCE_OVERLOAD_MESSAGE,
@@ -107,74 +208,219 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
         runtime_metrics.record_connection_opened()
         connection_opened = True
 
-    logging.info(
-        f"[WebSocket] Connection accepted for session: {session_id}, "
-        f"connection_id={connection_id}"
+    log = logging.LoggerAdapter(
+        logger,
+        {"session_id": session_id, "connection_id": connection_id},
     )
 
+    log.info(
+        "[WebSocket] Connection accepted for session: %s, connection_id=%s",
+        session_id,
+        connection_id,
+    )
+    loop = asyncio.get_running_loop()
+    # Audio processing for one connection is strictly sequential, so a single
+    # context snapshot carrying the correlation IDs can be reused per chunk.
+    audio_ctx = contextvars.copy_context()
+
     # Initialize components
-    processor = AudioProcessor()
+    processor = websocket.app.state.audio_processor
+    # The processor is shared; resampler history is kept per connection.
+    resample_state = ResampleState()
     storage = StorageManager(session_id)
 
     # Get global model from app state
     model = websocket.app.state.model
     inference_executor = websocket.app.state.inference_executor
-    inference_service = ASRInferenceService(model, inference_executor)
+    inference_service = ASRInferenceService(
+        model,
+        inference_executor,
+        websocket.app.state.stream_decoder,
+    )
+    audio_executor = websocket.app.state.audio_executor
     last_text: str = ""
     last_is_final: bool = True
     skip_auto_finalize = False
     debug_audio_writer: DebugAudioWriter | None = None
+    debug_audio_append: asyncio.Future[DebugAudioWriter | None] | None = None
     debug_audio_enabled = is_debug_audio_enabled()
+    debug_logging_enabled = log.isEnabledFor(logging.DEBUG)
+    outbound: OutboundEventPump | None = None
+    if settings.RETURN_TRANSCRIPTION:
+        outbound = OutboundEventPump(websocket)
+
+    # Ensure session exists in DB to satisfy foreign key constraints. This runs
+    # in the background so audio can be received and transcribed meanwhile; it
+    # is awaited before anything is written to MySQL.
+    session_ready = asyncio.create_task(
+        storage.ensure_session_exists(user_id=WEBSOCKET_USER_ID)
+    )
+
+    audio_queue: asyncio.Queue[np.ndarray | None] = asyncio.Queue(
+        maxsize=AUDIO_PIPELINE_DEPTH
+    )
+    client_gone = False
+
+    async def receive_audio() -> None:
+        """Receive and preprocess audio chunks into ``audio_queue``.
+
+        Runs alongside the inference loop so the next chunk is read and
+        decoded while the previous one is still being transcribed. A ``None``
+        sentinel marks the end of the stream.
+        """
+        nonlocal client_gone, connection_had_error, debug_audio_writer, debug_audio_append
+        try:
+            while True:
+                # 1. Receive Audio Bytes
+                try:
+                    data = await websocket.receive_bytes()
+                except WebSocketDisconnect:
+                    client_gone = True
+                    raise
+                except Exception as e:
+                    connection_had_error = True
+                    if runtime_metrics is not None:
+                        runtime_metrics.record_receive_error()
+                    log.error("[WebSocket] Receive error: %s", e)
+                    break
+
+                if runtime_metrics is not None:
+                    runtime_metrics.record_websocket_chunk(len(data))
+
+                # 2. Process Audio (G.711 -> PCM -> Samples)
+                audio_start = time.perf_counter()
+                try:
+                    samples = await loop.run_in_executor(
+                        audio_executor,
+                        audio_ctx.run,
+                        processor.process,
+                        data,
+                        resample_state,
+                    )
+                except Exception as e:
+                    if runtime_metrics is not None:
+                        runtime_metrics.record_audio_processing_error()
+                    log.error("[WebSocket] Audio processing error: %s", e)
+                    continue
+                else:
+                    if runtime_metrics is not None:
+                        runtime_metrics.record_audio_processed(time.perf_counter() - audio_start)
+
+                if debug_audio_enabled:
+                    # Shielded so cancelling the receiver cannot abandon a
+                    # write in flight; the writer is closed only after it.
+                    debug_audio_append = asyncio.ensure_future(_append_debug_audio(
+                        loop=loop,
+                        writer=debug_audio_writer,
+                        session_id=session_id,
+                        samples=samples,
+                    ))
+                    debug_audio_writer = await asyncio.shield(debug_audio_append)
+
+                await audio_queue.put(samples)
+        except Exception:
+            await audio_queue.put(None)
+            raise
+        await audio_queue.put(None)
+
+    receiver: asyncio.Task[None] | None = None
+    final_save: asyncio.Task[Segment] | None = None
+    final_save_seq = 0
+
+    async def persist_final(text: str, seq: int) -> Segment:
+        """Persist a final segment whose event has already been queued.
+
+        Runs as a background task so inference continues while MySQL
+        commits. The sequence was reserved before the event was sent, so
+        only the database write happens here.
+
+        Args:
+            text: The final transcription text.
+            seq: The sequence number reserved for this segment.
+
+        Returns:
+            The stored segment, whose sequence differs from ``seq`` if another
+            worker had already stored that sequence for the session.
+        """
+        nonlocal connection_had_error
+        storage_start = time.perf_counter()
+        try:
+            await session_ready
+            saved_segment = await storage.save_final(
+                text,
+                user_id=WEBSOCKET_USER_ID,
+                seq=seq,
+            )
+        except Exception:
+            connection_had_error = True
+            if runtime_metrics is not None:
+                runtime_metrics.record_storage_error()
+            raise
+
+        if runtime_metrics is not None:
+            runtime_metrics.record_final_save(time.perf_counter() - storage_start)
+            runtime_metrics.record_final()
+        if saved_segment and debug_logging_enabled:
+            log.debug("[WebSocket] Persisted FINAL (Seq: %d)", saved_segment.segment_seq)
+        return saved_segment
+
+    async def collect_final_save() -> None:
+        """Wait for the in-flight final save and re-announce a moved sequence.
+
+        Raises:
+            Exception: The error that failed the save.
+        """
+        nonlocal final_save, next_seq
+        if final_save is None:
+            return
+        task, final_save = final_save, None
+        saved_segment = await task
+        stored_seq = saved_segment.segment_seq
+        if stored_seq == final_save_seq:
+            return
+
+        # Another worker stored the reserved sequence first; partials for the
+        # next segment continue after the sequence actually stored.
+        next_seq = stored_seq + 1
+        log.warning(
+            "[WebSocket] FINAL Seq %d was already stored; saved as Seq %d",
+            final_save_seq,
+            stored_seq,
+        )
+        if outbound is not None and not client_gone:
+            outbound.put({
+                "type": "final",
+                "text": saved_segment.content,
+                "seq": stored_seq
+            })
+
+    async def drain_final_save() -> None:
+        """Wait for an in-flight final save, logging rather than raising."""
+        try:
+            await collect_final_save()
+        except Exception as e:
+            log.error("[WebSocket] Failed to save final segment: %s", e)
 
     try:
+        receiver = asyncio.create_task(receive_audio())
+
         # Determine current sequence number to handle reconnections or continuations
         current_seq = await storage.get_current_sequence()
         next_seq = current_seq + 1
-        loop = asyncio.get_running_loop()
 
-        logging.info(f"[WebSocket] Client connected: {session_id}. Start Seq: {next_seq}")
-
-        # Ensure session exists in DB to satisfy foreign key constraints
-        await storage.ensure_session_exists(user_id="websocket_client")
+        log.info("[WebSocket] Client connected: %s. Start Seq: %d", session_id, next_seq)
 
         while True:
-            # 1. Receive Audio Bytes
-            try:
-                data = await websocket.receive_bytes()
-            except WebSocketDisconnect:
-                raise
-            except Exception as e:
-                connection_had_error = True
-                if runtime_metrics is not None:
-                    runtime_metrics.record_receive_error()
-                logging.error(f"[WebSocket] Receive error: {e}")
+            samples = await audio_queue.get()
+            if final_save is not None and final_save.done():
+                # Surface a failed background save or a moved sequence.
+                await collect_final_save()
+
+            if samples is None:
+                # Surface a disconnect or unexpected receive failure.
+                await receiver
                 break
 
-            if runtime_metrics is not None:
-                runtime_metrics.record_websocket_chunk(len(data))
-
-            # 2. Process Audio (G.711 -> PCM -> Samples)
-            audio_start = time.perf_counter()
-            try:
-                ctx = contextvars.copy_context()
-                samples = await loop.run_in_executor(None, ctx.run, processor.process, data)
-            except Exception as e:
-                if runtime_metrics is not None:
-                    runtime_metrics.record_audio_processing_error()
-                logging.error(f"[WebSocket] Audio processing error: {e}")
-                continue
-            else:
-                if runtime_metrics is not None:
-                    runtime_metrics.record_audio_processed(time.perf_counter() - audio_start)
-
-            if debug_audio_enabled:
-                debug_audio_writer = await _append_debug_audio(
-                    loop=loop,
-                    writer=debug_audio_writer,
-                    session_id=session_id,
-                    samples=samples,
-                )
-
             # 3. Inference
             try:
                 text, is_final = await inference_service.infer(samples)
@@ -182,12 +428,21 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
                 skip_auto_finalize = True
                 if runtime_metrics is not None:
                     runtime_metrics.record_overload_close()
-                logging.warning(f"[WebSocket] Inference overloaded for session {session_id}: {exc}")
+                log.warning(
+                    "[WebSocket] Inference overloaded for session %s: %s",
+                    session_id,
+                    exc,
+                )
+                await _cancel_task(receiver)
+                await drain_final_save()
                 try:
+                    if outbound is not None:
+                        await outbound.close()
                     await _send_inference_overload_error(websocket)
                 except Exception as send_exc:
-                    logging.error(
-                        f"[WebSocket] Failed to send inference overload error: {send_exc}"
+                    log.error(
+                        "[WebSocket] Failed to send inference overload error: %s",
+                        send_exc,
                     )
                 break
 
@@ -202,41 +457,29 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
                 continue
 
             if is_final:
-                # 4. Save Final
-                storage_start = time.perf_counter()
-                try:
-                    saved_segment = await storage.save_final(text)
-                except Exception:
-                    connection_had_error = True
-                    if runtime_metrics is not None:
-                        runtime_metrics.record_storage_error()
-                    raise
-                else:
-                    if runtime_metrics is not None:
-                        runtime_metrics.record_final_save(
-                            time.perf_counter() - storage_start
-                        )
-
-                if saved_segment:
-                    next_seq = saved_segment.segment_seq + 1
-                    response_seq = saved_segment.segment_seq
-                else:
-                    response_seq = next_seq
-                    next_seq += 1
-
-                if runtime_metrics is not None:
-                    runtime_metrics.record_final()
+                # 4. Save Final. The sequence is reserved up front so the
+                # event can be queued in order right away; only the MySQL
+                # write runs in the background, one at a time per connection.
+                await collect_final_save()
+                response_seq = await storage.get_next_sequence()
+                next_seq = response_seq + 1
+                final_save_seq = response_seq
+                final_save = asyncio.create_task(persist_final(text, response_seq))
 
                 # 5. Feedback (Final)
-                if settings.RETURN_TRANSCRIPTION:
-                    await websocket.send_json({
+                if outbound is not None and not client_gone:
+                    outbound.put({
                         "type": "final",
                         "text": text,
                         "seq": response_seq
                     })
-                    logging.info(f"[WebSocket] Sent FINAL: {text} (Seq: {response_seq})")
+                    log.info("[WebSocket] Sent FINAL: %s (Seq: %d)", text, response_seq)
                 else:
-                    logging.info(f"[WebSocket] Tracking FINAL: {text} (Seq: {response_seq}) (Response Disabled)")
+                    log.info(
+                        "[WebSocket] Tracking FINAL: %s (Seq: %d) (Response Disabled)",
+                        text,
+                        response_seq,
+                    )
 
             else:
                 # 4. Save Partial
@@ -246,7 +489,7 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
                 except Exception:
                     if runtime_metrics is not None:
                         runtime_metrics.record_storage_error()
-                    logging.error("[WebSocket] Failed to save partial", exc_info=True)
+                    log.error("[WebSocket] Failed to save partial", exc_info=True)
                     continue
                 else:
                     if runtime_metrics is not None:
@@ -256,37 +499,49 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
                         runtime_metrics.record_partial()
 
                 # 5. Feedback (Partial)
-                if settings.RETURN_TRANSCRIPTION:
-                    await websocket.send_json({
+                if outbound is not None and not client_gone:
+                    outbound.put({
                         "type": "partial",
                         "text": text,
                         "seq": next_seq
                     })
-                    logging.debug(f"[WebSocket] Sent PARTIAL: {text} (Seq: {next_seq})")
-                else:
-                    logging.debug(f"[WebSocket] Tracking PARTIAL: {text} (Seq: {next_seq}) (Response Disabled)")
+                    if debug_logging_enabled:
+                        log.debug("[WebSocket] Sent PARTIAL: %s (Seq: %d)", text, next_seq)
+                elif debug_logging_enabled:
+                    log.debug(
+                        "[WebSocket] Tracking PARTIAL: %s (Seq: %d) (Response Disabled)",
+                        text,
+                        next_seq,
+                    )
 
     except WebSocketDisconnect:
         connection_disconnected = True
-        logging.info(f"[WebSocket] Client disconnected: {session_id}")
+        log.info("[WebSocket] Client disconnected: %s", session_id)
     except Exception as e:
         connection_had_error = True
-        logging.error(f"[WebSocket] Unexpected error: {e}", exc_info=True)
+        log.error("[WebSocket] Unexpected error: %s", e, exc_info=True)
     finally:
+        if receiver is not None:
+            await _cancel_task(receiver)
+
         try:
-            loop = asyncio.get_running_loop()
-        except RuntimeError:
-            loop = None
+            await session_ready
+        except Exception as e:
+            connection_had_error = True
+            log.error("[WebSocket] Failed to ensure session exists: %s", e)
+
+        await drain_final_save()
 
         # Check if we have a pending partial result that needs to be finalized
         if last_text and not last_is_final and not skip_auto_finalize:
-            logging.info(
-                f"[WebSocket] Connection closed with pending partial. Finalizing: '{last_text}'"
+            log.info(
+                "[WebSocket] Connection closed with pending partial. Finalizing: '%s'",
+                last_text,
             )
             try:
                 # Save as final
                 storage_start = time.perf_counter()
-                saved_segment = await storage.save_final(last_text)
+                saved_segment = await storage.save_final(last_text, user_id=WEBSOCKET_USER_ID)
                 if runtime_metrics is not None:
                     runtime_metrics.record_final_save(
                         time.perf_counter() - storage_start
@@ -294,14 +549,30 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
                     runtime_metrics.record_final()
                     runtime_metrics.record_auto_finalized()
                 if saved_segment:
-                    logging.info(f"[WebSocket] Auto-finalized segment seq: {saved_segment.segment_seq}")
+                    log.info(
+                        "[WebSocket] Auto-finalized segment seq: %d",
+                        saved_segment.segment_seq,
+                    )
             except Exception as e:
                 connection_had_error = True
                 if runtime_metrics is not None:
                     runtime_metrics.record_storage_error()
-                logging.error(f"[WebSocket] Failed to auto-finalize pending text: {e}")
+                log.error("[WebSocket] Failed to auto-finalize pending text: %s", e)
+
+        if outbound is not None:
+            try:
+                if connection_disconnected:
+                    await outbound.abort()
+                else:
+                    await outbound.close()
+            except Exception as e:
+                log.error("[WebSocket] Failed to flush outbound events: %s", e)
 
-        if debug_audio_enabled and loop is not None:
+        if debug_audio_enabled:
+            if debug_audio_append is not None:
+                # The receiver may have been cancelled mid-write; finish that
+                # write, and keep the writer it may have just created.
+                debug_audio_writer = await debug_audio_append
             await _close_debug_audio_writer(loop, debug_audio_writer)
 
         if connection_opened and runtime_metrics is not None:
@@ -311,6 +582,6 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
                 error=connection_had_error,
             )
 
-        logging.info(f"[WebSocket] Connection closed: {session_id}")
+        log.info("[WebSocket] Connection closed: %s", session_id)
         connection_id_ctx.reset(connection_token)
         session_id_ctx.reset(token)
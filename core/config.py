@@ -14,6 +14,16 @@ def default_asr_inference_workers() -> int:
     return max(1, (os.cpu_count() or 2) // 2)
 
 
+def default_asr_model_threads() -> int:
+    """Return the default ONNX Runtime thread count for the ASR model."""
+    return max(1, min(4, os.cpu_count() or 1))
+
+
+def default_audio_processing_workers() -> int:
+    """Return the default per-process audio preprocessing worker count."""
+    return os.cpu_count() or 1
+
+
 class Settings(BaseSettings):
     """Application settings using Pydantic BaseSettings.
 
@@ -21,6 +31,11 @@ class Settings(BaseSettings):
     """
     PROJECT_NAME: str = "PyStreamASR"
     MYSQL_DATABASE_URL: str
+    MYSQL_POOL_RECYCLE_SECONDS: int = Field(default=1800, ge=-1)
+    MYSQL_POOL_SIZE: int = Field(default=20, ge=1)
+    MYSQL_MAX_OVERFLOW: int = Field(default=10, ge=0)
+    MYSQL_POOL_TIMEOUT_SECONDS: float = Field(default=30.0, gt=0)
+    MYSQL_CONNECT_TIMEOUT_SECONDS: int = Field(default=5, ge=1)
     MODEL_PATH: str
     LOG_LEVEL: str = "INFO"
     LOG_DIR: str = "logs"
@@ -33,6 +48,9 @@ class Settings(BaseSettings):
     ASR_INFERENCE_WORKERS: int = Field(default_factory=default_asr_inference_workers, ge=1)
     ASR_INFERENCE_QUEUE_SIZE: int | None = Field(default=None, ge=0)
     ASR_INFERENCE_QUEUE_TIMEOUT_SECONDS: float = Field(default=20.0, gt=0)
+    ASR_MODEL_NUM_THREADS: int = Field(default_factory=default_asr_model_threads, ge=1)
+    ASR_PARALLEL_BATCHES: int | None = Field(default=None, ge=1)
+    AUDIO_PROCESSING_WORKERS: int = Field(default_factory=default_audio_processing_workers, ge=1)
 
     @field_validator("APP_HOST")
     @classmethod
@@ -58,6 +76,13 @@ class Settings(BaseSettings):
         """Populate defaults that depend on other settings."""
         if self.ASR_INFERENCE_QUEUE_SIZE is None:
             self.ASR_INFERENCE_QUEUE_SIZE = self.ASR_INFERENCE_WORKERS * 4
+        if self.ASR_PARALLEL_BATCHES is None:
+            # Enough parallel batches to use every core at the configured
+            # model thread count; more leaders than workers would never run.
+            self.ASR_PARALLEL_BATCHES = min(
+                self.ASR_INFERENCE_WORKERS,
+                max(1, (os.cpu_count() or 1) // self.ASR_MODEL_NUM_THREADS),
+            )
         return self
 
     model_config = SettingsConfigDict(
@@ -1,66 +1,108 @@
+import atexit
 import logging
 import os
-from datetime import datetime
-from logging.handlers import TimedRotatingFileHandler
+import queue
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
 from core.context import connection_id_ctx, session_id_ctx
 
+APP_LOG_FILENAME = "app.log"
+
+_queue_listener: QueueListener | None = None
+
 
 class CorrelationIdFilter(logging.Filter):
-    """Filter that injects the session ID into the log record."""
+    """Filter that injects the session ID into the log record.
+
+    Records that already carry the IDs, such as those logged through a
+    ``LoggerAdapter`` bound to a connection, skip the context lookups.
+    """
 
     def filter(self, record):
-        record.session_id = session_id_ctx.get()
-        record.connection_id = connection_id_ctx.get()
+        if not hasattr(record, "session_id"):
+            record.session_id = session_id_ctx.get()
+        if not hasattr(record, "connection_id"):
+            record.connection_id = connection_id_ctx.get()
         return True
 
 
+def stop_logging() -> None:
+    """Flush queued log records and stop the background listener."""
+    global _queue_listener
+    if _queue_listener is None:
+        return
+
+    _queue_listener.stop()
+    for handler in _queue_listener.handlers:
+        handler.close()
+    _queue_listener = None
+
+
 def setup_logging(settings):
     """Configures logging for the application.
 
     Sets up both file-based logging (with daily rotation) and console logging.
+    The active file is always ``app.log``; at UTC midnight the handler renames
+    it with a date suffix and keeps the last seven days.
+    Records are enqueued by the calling thread and written by a background
+    ``QueueListener``, so file and console I/O never run on the event loop.
 
     Args:
         settings: The application settings object containing LOG_LEVEL and LOG_DIR.
     """
+    global _queue_listener
+
     log_level = settings.LOG_LEVEL.upper()
     log_dir = settings.LOG_DIR
-    today = datetime.now().strftime("%Y-%m-%d")
-    log_filename = f"{today}.log"
 
     # Ensure log directory exists
     os.makedirs(log_dir, exist_ok=True)
 
-    log_path = os.path.join(log_dir, log_filename)
+    log_path = os.path.join(log_dir, APP_LOG_FILENAME)
 
     # Define format including session_id
     formatter = logging.Formatter(
         "%(asctime)s - [%(session_id)s/%(connection_id)s] - %(name)s - %(levelname)s - %(message)s"
     )
 
-    # Filter instance
-    correlation_filter = CorrelationIdFilter()
-
     # File Handler (Daily Rotation)
     file_handler = TimedRotatingFileHandler(
         log_path,
         when="midnight",
         interval=1,
         backupCount=7,
-        encoding="utf-8"
+        encoding="utf-8",
+        utc=True
     )
     file_handler.setFormatter(formatter)
-    file_handler.addFilter(correlation_filter)
 
     # Console Handler
     console_handler = logging.StreamHandler()
     console_handler.setFormatter(formatter)
-    console_handler.addFilter(correlation_filter)
+
+    # Queue Handler. The correlation filter must run here, in the thread that
+    # emitted the record, because the IDs live in context variables.
+    log_queue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.setFormatter(logging.Formatter("%(message)s"))
+    queue_handler.addFilter(CorrelationIdFilter())
+
+    stop_logging()
+    _queue_listener = QueueListener(
+        log_queue,
+        file_handler,
+        console_handler,
+        respect_handler_level=True,
+    )
+    _queue_listener.start()
 
     # Root Logger Configuration
     logging.basicConfig(
         level=log_level,
-        handlers=[file_handler, console_handler],
+        handlers=[queue_handler],
         force=True
     )
 
     logging.info(f"Logging initialized. Level: {log_level}, File: {log_path}")
+
+
+atexit.register(stop_logging)
@@ -6,9 +6,21 @@ import multiprocessing
 bind = "0.0.0.0:8000"
 
 # Worker configuration
-workers = multiprocessing.cpu_count() * 2 + 1
+# Uvicorn workers serve many connections concurrently on one event loop, so
+# the sync-worker "2 * CPU + 1" formula only multiplies model memory and DB
+# connections. One worker per CPU is enough; each worker also runs its own
+# ASR inference thread pool (ASR_INFERENCE_WORKERS).
+workers = max(2, multiprocessing.cpu_count())
+# UvicornWorker runs with loop="auto" and http="auto", which select uvloop and
+# httptools when installed; both are listed explicitly in requirements.txt.
 worker_class = "uvicorn.workers.UvicornWorker"
 
+# Import the app once in the master so library code and module state are
+# shared copy-on-write across workers. The ASR model itself is still loaded
+# per worker in the app lifespan: ONNX Runtime sessions own thread pools that
+# do not survive fork().
+preload_app = True
+
 # Timeout settings (seconds)
 timeout = 120
 keepalive = 5
@@ -25,3 +37,11 @@ proc_name = "pystreamasr"
 limit_request_line = 4094
 limit_request_fields = 100
 limit_request_field_size = 8190
+
+
+def post_fork(server, worker):
+    """Restart the background log listener thread in each forked worker."""
+    from core.config import settings
+    from core.logging import setup_logging
+
+    setup_logging(settings)
@@ -5,7 +5,8 @@ import logging
 # Initialize Logging
 setup_logging(settings)
 
-from services.inference import create_inference_executor, load_model
+from services.audio import AudioProcessor, create_audio_executor
+from services.inference import StreamBatchDecoder, create_inference_executor, load_model
 from services.storage import check_database_connections, engine
 from services.schemas import Base
 from api.endpoints import router as api_router
@@ -20,7 +21,14 @@ async def lifespan(app: FastAPI):
     # Load the model on startup
     logging.info("Loading AI Model...")
     app.state.model = load_model()
+    # AudioProcessor keeps no per-connection state, so one instance is shared.
+    app.state.audio_processor = AudioProcessor()
     app.state.inference_executor = create_inference_executor(settings)
+    app.state.stream_decoder = StreamBatchDecoder(
+        app.state.model,
+        max_batches=settings.ASR_PARALLEL_BATCHES,
+    )
+    app.state.audio_executor = create_audio_executor(settings)
 
     try:
         # Check Database Connections
@@ -35,6 +43,7 @@ async def lifespan(app: FastAPI):
     finally:
         logging.info("Shutting down...")
         app.state.inference_executor.shutdown()
+        app.state.audio_executor.shutdown(wait=False, cancel_futures=True)
 
 app = FastAPI(title=settings.PROJECT_NAME, lifespan=lifespan)
 
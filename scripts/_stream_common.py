@@ -0,0 +1,183 @@
+"""Audio helpers shared by the WebSocket stream simulators."""
+
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+from collections.abc import Iterator
+
+import g711
+import numpy as np
+import soundfile as sf
+import soxr
+
+
+_RIFF_HEADER = struct.Struct('<4sI4s')
+_CHUNK_HEADER = struct.Struct('<4sI')
+_FMT_FIELDS = struct.Struct('<HHIIHH')
+
+
+def _build_g711_lut(encoder_name: str) -> np.ndarray:
+    """Build a table mapping every int16 sample, viewed as uint16, to G.711.
+
+    Args:
+        encoder_name: Name of the ``g711`` encoder, ``encode_alaw`` or
+            ``encode_ulaw``.
+
+    Returns:
+        A 65536-entry ``uint8`` array indexed by ``pcm.view(np.uint16)``.
+    """
+    encoder = getattr(g711, encoder_name, None)
+    if encoder is None:
+        raise RuntimeError(f"g711.{encoder_name} is not available. Please update the g711 package.")
+
+    samples = np.arange(-32768, 32768, dtype=np.int16)
+    # g711 encodes normalized floats; int16 values would saturate.
+    encoded = np.frombuffer(encoder(samples.astype(np.float32) / 32768.0), dtype=np.uint8)
+    lut = np.empty(65536, dtype=np.uint8)
+    lut[samples.view(np.uint16)] = encoded
+    return lut
+
+
+_ALAW_LUT = _build_g711_lut("encode_alaw")
+_ULAW_LUT = _build_g711_lut("encode_ulaw")
+
+
+def float_to_pcm16(samples: np.ndarray) -> np.ndarray:
+    """Quantize float samples in [-1, 1] to int16 with rounding and saturation.
+
+    Scaling, rounding, and clipping happen in place on ``samples`` (after a
+    conversion to float32 if needed), so no full-size float temporaries are
+    allocated. Out-of-range input saturates instead of wrapping around.
+
+    Args:
+        samples: Float audio samples; overwritten when already float32.
+
+    Returns:
+        The quantized int16 samples.
+    """
+    scaled = np.asarray(samples, dtype=np.float32)
+    np.multiply(scaled, 32767.0, out=scaled)
+    np.rint(scaled, out=scaled)
+    np.clip(scaled, -32768, 32767, out=scaled)
+    return scaled.astype(np.int16)
+
+
+def iter_pcm16_blocks(
+    audio_file: str,
+    sample_rate: int,
+    block_seconds: float = 10.0,
+) -> Iterator[np.ndarray]:
+    """Decode an audio file to mono int16 at ``sample_rate``, block by block.
+
+    Blocks are read with libsndfile, downmixed to mono the same way
+    ``librosa.load`` does, and resampled with a streaming soxr resampler so
+    filter state carries across block boundaries. Only one block of decoded
+    samples is held in memory at once. Mono 16-bit PCM already at
+    ``sample_rate`` is read as int16 directly, skipping the float conversion.
+
+    Args:
+        audio_file: Path to a file readable by libsndfile.
+        sample_rate: Output sample rate in Hz.
+        block_seconds: Duration of each decoded block in seconds.
+
+    Yields:
+        Consecutive int16 sample blocks.
+
+    Raises:
+        soundfile.LibsndfileError: If libsndfile cannot open the file.
+    """
+    with sf.SoundFile(audio_file) as f:
+        resampler = None
+        if f.samplerate != sample_rate:
+            resampler = soxr.ResampleStream(f.samplerate, sample_rate, 1, dtype='float32')
+
+        blocksize = max(1, int(f.samplerate * block_seconds))
+        if resampler is None and f.channels == 1 and f.subtype == 'PCM_16':
+            # Already mono int16 at the target rate: no float round-trip.
+            yield from f.blocks(blocksize=blocksize, dtype='int16')
+            return
+
+        for block in f.blocks(blocksize=blocksize, dtype='float32', always_2d=True):
+            mono = block.mean(axis=1, dtype=np.float32)
+            if resampler is not None:
+                mono = resampler.resample_chunk(mono)
+            yield float_to_pcm16(mono)
+
+        if resampler is not None:
+            tail = resampler.resample_chunk(np.zeros(0, dtype=np.float32), last=True)
+            if tail.size:
+                yield float_to_pcm16(tail)
+
+
+def convert_to_alaw(pcm_data_int16: np.ndarray) -> bytes:
+    """Convert 16-bit PCM (numpy int16 array) to G.711 A-law bytes."""
+    pcm = np.ascontiguousarray(pcm_data_int16, dtype=np.int16)
+    return _ALAW_LUT[pcm.view(np.uint16)].tobytes()
+
+
+def convert_to_ulaw(pcm_data_int16: np.ndarray) -> bytes:
+    """Convert 16-bit PCM (numpy int16 array) to G.711 mu-law bytes."""
+    pcm = np.ascontiguousarray(pcm_data_int16, dtype=np.int16)
+    return _ULAW_LUT[pcm.view(np.uint16)].tobytes()
+
+
+def parse_wav_header(file_path: str) -> tuple[str, int, int, int]:
+    """Parse a WAV header to find its encoding and data chunk.
+
+    Args:
+        file_path: Path to the WAV file.
+
+    Returns:
+        ``(format_str, sample_rate, data_start_offset, data_length)``, where
+        ``format_str`` is ``"alaw"``, ``"ulaw"``, ``"pcm16le"``, or ``""`` for
+        unsupported or unparseable files.
+    """
+    try:
+        with open(file_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size < _RIFF_HEADER.size:
+                return "", 0, 0, 0
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                # RIFF header
+                chunk_id, _, format_tag = _RIFF_HEADER.unpack_from(mm, 0)
+                if chunk_id != b'RIFF' or format_tag != b'WAVE':
+                    return "", 0, 0, 0
+
+                fmt = ""
+                sample_rate = 0
+                size = len(mm)
+                offset = _RIFF_HEADER.size
+                # Walk chunk headers by offset; no reads or seeks
+                while offset + _CHUNK_HEADER.size <= size:
+                    subchunk_id, subchunk_size = _CHUNK_HEADER.unpack_from(mm, offset)
+                    offset += _CHUNK_HEADER.size
+
+                    if subchunk_id == b'fmt ':
+                        if subchunk_size < _FMT_FIELDS.size or offset + _FMT_FIELDS.size > size:
+                            break
+                        (audio_format, num_channels, sample_rate,
+                         _, _, bits_per_sample) = _FMT_FIELDS.unpack_from(mm, offset)
+
+                        if audio_format == 6 and num_channels == 1 and bits_per_sample == 8:
+                            fmt = "alaw"
+                        elif audio_format == 7 and num_channels == 1 and bits_per_sample == 8:
+                            fmt = "ulaw"
+                        elif audio_format == 1 and num_channels == 1 and bits_per_sample == 16:
+                            fmt = "pcm16le"
+                        else:
+                            # Unsupported encoding; no need to find the data chunk
+                            return "", 0, 0, 0
+
+                    elif subchunk_id == b'data':
+                        # Found data
+                        return fmt, sample_rate, offset, subchunk_size
+
+                    # Skip to the next chunk, including any fmt extension.
+                    # RIFF pads odd-sized chunks to an even boundary.
+                    offset += subchunk_size + (subchunk_size & 1)
+
+    except Exception as e:
+        print(f"Header parse error: {e}")
+
+    return "", 0, 0, 0
@@ -29,6 +29,7 @@ DEFAULT_ENV_FILE = ROOT_DIR / ".env"
 DEFAULT_STATE_FILE = ROOT_DIR / "logs" / "service_state.json"
 DEFAULT_LOG_FILE = ROOT_DIR / "logs" / "service_manager.log"
 DEFAULT_INSTALL_METADATA_FILE = ROOT_DIR / "logs" / "service_install.json"
+APP_LOG_FILENAME = "app.log"
 DATE_LOG_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}\.log$")
 MAX_LOG_LINES = 5000
 DEFAULT_LOG_LINES = 200
@@ -807,7 +808,11 @@ class ServiceController:
         return self.resolve_path(values.get("LOG_DIR", "logs"))
 
     def find_preferred_app_log(self, log_dir: Path) -> Path | None:
-        """Return today's date log or the latest date-stamped app log."""
+        """Return the active app log, falling back to legacy date-stamped logs."""
+        app_log_path = log_dir / APP_LOG_FILENAME
+        if app_log_path.exists():
+            return app_log_path
+
         today_name = f"{datetime.now().strftime('%Y-%m-%d')}.log"
         today_path = log_dir / today_name
         if today_path.exists():
@@ -852,7 +857,6 @@ class ServiceController:
         sources: list[LogSource] = []
 
         if app_log_path is None:
-            expected_today = log_dir / f"{datetime.now().strftime('%Y-%m-%d')}.log"
             sources.append(
                 LogSource(
                     source_id="app_log",
@@ -860,7 +864,7 @@ class ServiceController:
                     available=False,
                     backend="common",
                     kind="file",
-                    descriptor=str(expected_today),
+                    descriptor=str(log_dir / APP_LOG_FILENAME),
                 )
             )
         else:
@@ -9,20 +9,25 @@ Usage:
 
 import argparse
 import asyncio
+import concurrent.futures
+import glob
 import sys
 import numpy as np
+import orjson
 import websockets
 import json
 import time
 import os
-import struct
+import re
 from dataclasses import dataclass
+from pathlib import Path
 from typing import Any, Optional
 from dotenv import load_dotenv
 
 try:
     import soundfile as sf
     import librosa
+    import soxr
 except ImportError:
     print("Error: Please install required libraries via 'pip install -r requirements.txt'")
     sys.exit(1)
@@ -33,8 +38,37 @@ except ImportError:
     print("Error: 'g711' library not found. Install it via 'pip install g711'.")
     sys.exit(1)
 
+ROOT_DIR = Path(__file__).resolve().parents[1]
 
-@dataclass
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from scripts._stream_common import (
+    convert_to_alaw,
+    float_to_pcm16,
+    iter_pcm16_blocks,
+    parse_wav_header,
+)
+
+
+# Shortest interval between sender wakeups; shorter chunks are batched.
+MIN_SEND_INTERVAL = 0.05
+# Longest wait for the trailing final result after the last chunk is sent.
+RESULT_DRAIN_TIMEOUT = 2.0
+# Type markers as serialized by the server's compact JSON encoder.
+_PARTIAL_MARKER = b'"type":"partial"'
+_FINAL_MARKER = b'"type":"final"'
+# Escaped quotes inside transcript text cannot form this key.
+_SEQ_FIELD = re.compile(rb'"seq":\s*(-?\d+)')
+
+
+def _event_seq(message: bytes) -> int | None:
+    """Return the ``seq`` of a partial or final event frame, if present."""
+    match = _SEQ_FIELD.search(message)
+    return int(match.group(1)) if match else None
+
+
+@dataclass(slots=True)
 class StreamStats:
     """Statistics for a single stream."""
     stream_id: str
@@ -130,55 +164,49 @@ def write_json_report(report: dict[str, Any], output_path: str) -> None:
         f.write("\n")
 
 
-def convert_to_alaw(pcm_data_int16: np.ndarray) -> bytes:
-    """Convert 16-bit PCM (numpy int16 array) to G.711 A-law bytes."""
-    if not hasattr(g711, "encode_alaw"):
-        raise RuntimeError("g711.encode_alaw is not available. Please update the g711 package.")
+def convert_file_to_alaw(audio_file: str, block_seconds: float = 10.0) -> bytes:
+    """Convert an audio file to 8 kHz mono A-law one block at a time.
 
-    try:
-        return g711.encode_alaw(pcm_data_int16.tobytes())
-    except Exception:
-        return g711.encode_alaw(pcm_data_int16.tolist())
+    Only one block of decoded samples is held in memory at once, so peak
+    memory does not grow with the length of the file.
 
+    Args:
+        audio_file: Path to a file readable by libsndfile.
+        block_seconds: Duration of each decoded block in seconds.
 
-def parse_wav_header(file_path: str) -> tuple[bool, int, int]:
+    Returns:
+        The encoded A-law bytes.
+
+    Raises:
+        soundfile.LibsndfileError: If libsndfile cannot open the file.
     """
-    Parses WAV header to determine if it's G.711 A-law (Format=6) or PCM (Format=1).
-    Returns (is_alaw, data_start_offset, data_length).
+    out = bytearray()
+    for block in iter_pcm16_blocks(audio_file, 8000, block_seconds):
+        out += convert_to_alaw(block)
+    return bytes(out)
+
+
+def alaw_cache_path(audio_file: str) -> str:
+    """Return the sidecar path caching an audio file's 8 kHz A-law conversion.
+
+    The path embeds the source mtime and size, so edits to the source
+    produce a new cache entry instead of reusing a stale one.
+
+    Args:
+        audio_file: Path to the source audio file.
+
+    Returns:
+        The ``<file>.<mtime_ns>.<size>.alaw8k`` cache path.
     """
-    try:
-        with open(file_path, 'rb') as f:
-            chunk_id, size, format_tag = struct.unpack('<4sI4s', f.read(12))
-            if chunk_id != b'RIFF' or format_tag != b'WAVE':
-                return False, 0, 0
-            
-            is_alaw_ready = False
-            while True:
-                chunk_header = f.read(8)
-                if len(chunk_header) < 8:
-                    break
-                subchunk_id, subchunk_size = struct.unpack('<4sI', chunk_header)
-                
-                if subchunk_id == b'fmt ':
-                    fmt_data = f.read(subchunk_size)
-                    audio_format, num_channels, sample_rate, byte_rate, block_align, bits_per_sample = struct.unpack('<HHIIHH', fmt_data[:16])
-                    is_alaw_ready = (audio_format == 6 and num_channels == 1 and sample_rate == 8000 and bits_per_sample == 8)
-                elif subchunk_id == b'data':
-                    data_start = f.tell()
-                    return is_alaw_ready, data_start, subchunk_size
-                else:
-                    f.seek(subchunk_size, 1)
-                    
-    except Exception as e:
-        print(f"Header parse error: {e}")
-    
-    return False, 0, 0
+    stat = os.stat(audio_file)
+    return f"{audio_file}.{stat.st_mtime_ns}.{stat.st_size}.alaw8k"
 
 
 def load_audio_data(audio_file: str) -> bytes:
     """
     Loads audio file and returns G.711 A-law bytes.
     Pre-loads entire file to avoid repeated I/O during concurrent streams.
+    PCM conversions are cached next to the source file for later runs.
     """
     ext = os.path.splitext(audio_file)[1].lower()
     
@@ -188,55 +216,153 @@ def load_audio_data(audio_file: str) -> bytes:
             return f.read()
     
     # Check WAV header for native A-law
-    is_alaw, data_offset, data_len = parse_wav_header(audio_file)
-    if is_alaw:
+    wav_format, wav_sr, data_offset, data_len = parse_wav_header(audio_file)
+    if wav_format == "alaw" and wav_sr == 8000:
         with open(audio_file, 'rb') as f:
             f.seek(data_offset)
             return f.read(data_len)
     
+    # Reuse a previous conversion of the same file contents
+    cache_path = alaw_cache_path(audio_file)
+    if os.path.exists(cache_path):
+        with open(cache_path, 'rb') as f:
+            return f.read()
+
     # Convert PCM to A-law
-    y, sr = librosa.load(audio_file, sr=8000)
-    pcm_data = (y * 32767).astype(np.int16)
-    return convert_to_alaw(pcm_data)
+    try:
+        alaw_data = convert_file_to_alaw(audio_file)
+    except sf.LibsndfileError:
+        # Formats libsndfile cannot open still go through librosa's loaders.
+        y, sr = librosa.load(audio_file, sr=8000, dtype=np.float32)
+        pcm_data = float_to_pcm16(y)
+        alaw_data = convert_to_alaw(pcm_data)
+
+    for stale_path in glob.glob(f"{glob.escape(audio_file)}.*.alaw8k"):
+        try:
+            os.remove(stale_path)
+        except OSError:
+            pass
+    try:
+        with open(cache_path, 'wb') as f:
+            f.write(alaw_data)
+    except OSError as e:
+        print(f"Warning: could not write A-law cache {cache_path}: {e}")
+
+    return alaw_data
+
+
+def load_audio_files(file_list: list[str]) -> list[bytes]:
+    """Load several audio files as A-law, converting them in parallel.
+
+    Conversion is CPU-bound NumPy and resampling work, so multiple files are
+    spread across a process pool rather than threads.
+
+    Args:
+        file_list: Paths of the audio files to load.
+
+    Returns:
+        The A-law bytes of each file, in ``file_list`` order.
+    """
+    if len(file_list) == 1:
+        return [load_audio_data(file_list[0])]
+
+    max_workers = min(len(file_list), os.cpu_count() or 1)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(load_audio_data, file_list))
+
+
+def split_audio_chunks(audio_data: bytes, chunk_duration: float) -> list[memoryview]:
+    """Split A-law audio into fixed-duration chunks.
+
+    Chunks are zero-copy views into ``audio_data``. The list is built once per
+    run and shared by every stream, since sending does not mutate the chunks.
+
+    Args:
+        audio_data: 8 kHz A-law audio bytes.
+        chunk_duration: Duration per chunk in seconds.
+
+    Returns:
+        Consecutive views of ``audio_data``; the last one may be shorter.
+    """
+    chunk_size = int(8000 * chunk_duration)
+    view = memoryview(audio_data)
+    return [view[i:i + chunk_size] for i in range(0, len(view), chunk_size)]
 
 
 async def stream_sender(
     websocket,
-    audio_data: bytes,
+    chunks: list[memoryview],
     chunk_duration: float,
-    stats: StreamStats
+    stats: StreamStats,
+    final_event: asyncio.Event | None = None
 ) -> None:
-    """Streams audio chunks to WebSocket."""
-    chunk_size = int(8000 * chunk_duration)
-    total_len = len(audio_data)
-    offset = 0
+    """Streams audio chunks to WebSocket.
+
+    Chunks shorter than ``MIN_SEND_INTERVAL`` are sent in back-to-back
+    batches with one sleep per batch, keeping the average rate real-time
+    while limiting timer wakeups. ``final_event``, when given, is cleared just
+    before the last chunk is sent; ``stream_receiver`` decides which finals
+    may set it again.
+    """
+    batch = max(1, int(MIN_SEND_INTERVAL / chunk_duration))
+    # Pace against absolute deadlines so send time does not accumulate as drift.
+    loop = asyncio.get_running_loop()
+    deadline = loop.time()
     
     try:
-        while offset < total_len:
-            end = min(offset + chunk_size, total_len)
-            chunk = audio_data[offset:end]
-            await websocket.send(chunk)
-            stats.chunks_sent += 1
-            offset = end
-            await asyncio.sleep(chunk_duration)
+        for start in range(0, len(chunks), batch):
+            for chunk in chunks[start:start + batch]:
+                if final_event is not None and chunk is chunks[-1]:
+                    final_event.clear()
+                await websocket.send(chunk)
+                stats.chunks_sent += 1
+                deadline += chunk_duration
+            if start + batch < len(chunks):
+                await asyncio.sleep(max(0.0, deadline - loop.time()))
     except Exception as e:
         stats.error = f"Send error: {e}"
 
 
-async def stream_receiver(websocket, stats: StreamStats) -> None:
-    """Receives messages from WebSocket."""
+async def stream_receiver(
+    websocket,
+    stats: StreamStats,
+    final_event: asyncio.Event | None = None
+) -> None:
+    """Receives messages from WebSocket.
+
+    Partial and final events are counted by scanning the raw frame for the
+    server's compact type marker; only other events are fully parsed. JSON
+    string values escape their quotes, so transcript text cannot match.
+    ``final_event``, when given, is set when a final arrives whose ``seq`` is
+    at least that of the latest partial, so a late final for an earlier
+    segment does not end the drain while the trailing segment is still open.
+    """
+    last_partial_seq = 0
     try:
         while True:
-            message = await websocket.recv()
-            data = json.loads(message)
-            
-            msg_type = data.get("type", "unknown")
+            message = await websocket.recv(decode=False)
             stats.messages_received += 1
             
+            if _PARTIAL_MARKER in message:
+                msg_type = "partial"
+            elif _FINAL_MARKER in message:
+                msg_type = "final"
+            else:
+                data = orjson.loads(message)
+                msg_type = data.get("type", "unknown")
+            
             if msg_type == "partial":
                 stats.partials_received += 1
+                if final_event is not None:
+                    seq = _event_seq(message)
+                    if seq is not None:
+                        last_partial_seq = seq
             elif msg_type == "final":
                 stats.finals_received += 1
+                if final_event is not None:
+                    seq = _event_seq(message)
+                    if seq is None or seq >= last_partial_seq:
+                        final_event.set()
             elif msg_type == "error":
                 stats.errors_received += 1
                 error_code = data.get("code", "unknown")
@@ -256,11 +382,21 @@ async def stream_receiver(websocket, stats: StreamStats) -> None:
 async def run_single_stream(
     stream_id: str,
     host_base: str,
-    audio_data: bytes,
+    chunks: list[memoryview],
     chunk_duration: float,
-    verbose: bool = False
+    connect_sem: asyncio.Semaphore,
+    verbose: bool = False,
+    enable_compression: bool = False,
+    keepalive: bool = False
 ) -> StreamStats:
-    """Runs a single WebSocket stream from start to finish."""
+    """Runs a single WebSocket stream from start to finish.
+
+    Only the connection handshake is bounded by ``connect_sem``; streaming
+    itself runs fully in parallel with the other streams. permessage-deflate
+    is off unless ``enable_compression`` is set, since A-law audio does not
+    compress and deflate would only cost client and server CPU. Keepalive
+    pings are off unless ``keepalive`` is set, saving a timer per connection.
+    """
     stats = StreamStats(stream_id=stream_id)
     ws_url = f"{host_base}/{stream_id}"
     
@@ -270,29 +406,42 @@ async def run_single_stream(
     stats.start_time = time.time()
     
     try:
-        async with websockets.connect(ws_url) as websocket:
+        async with connect_sem:
+            websocket = await websockets.connect(
+                ws_url,
+                compression="deflate" if enable_compression else None,
+                max_size=None,
+                ping_interval=20 if keepalive else None,
+                ping_timeout=20 if keepalive else None,
+            )
+        async with websocket:
             if verbose:
                 print(f"[{stream_id}] Connected.")
             
-            # Run sender and receiver concurrently
-            sender_task = asyncio.create_task(
-                stream_sender(websocket, audio_data, chunk_duration, stats)
-            )
-            receiver_task = asyncio.create_task(
-                stream_receiver(websocket, stats)
-            )
-            
-            # Wait for sender to finish
-            await sender_task
-            
-            # Give receiver time to get final results
-            await asyncio.sleep(2.0)
-            receiver_task.cancel()
-            
-            try:
-                await receiver_task
-            except asyncio.CancelledError:
-                pass
+            # Run sender and receiver concurrently; the task group joins
+            # both (and the drain waiter) before the connection closes.
+            final_event = asyncio.Event()
+            async with asyncio.TaskGroup() as tg:
+                sender_task = tg.create_task(
+                    stream_sender(websocket, chunks, chunk_duration, stats, final_event)
+                )
+                receiver_task = tg.create_task(
+                    stream_receiver(websocket, stats, final_event)
+                )
+                
+                # Wait for sender to finish
+                await sender_task
+                
+                # Wait for the final result of the trailing audio, up to
+                # RESULT_DRAIN_TIMEOUT, or until the server closes the connection.
+                final_waiter = tg.create_task(final_event.wait())
+                await asyncio.wait(
+                    {final_waiter, receiver_task},
+                    timeout=RESULT_DRAIN_TIMEOUT,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                final_waiter.cancel()
+                receiver_task.cancel()
                 
     except Exception as e:
         stats.error = f"Connection error: {e}"
@@ -309,27 +458,35 @@ async def run_single_stream(
 
 async def run_concurrent_streams(
     host_base: str,
-    audio_data: bytes,
+    audio_clips: list[bytes],
     num_streams: int,
     chunk_duration: float,
     stagger_delay: float,
-    verbose: bool = False
+    verbose: bool = False,
+    connect_concurrency: int = 32,
+    enable_compression: bool = False,
+    keepalive: bool = False
 ) -> tuple[list[StreamStats], float]:
     """
     Runs multiple concurrent streams with optional staggered start.
     
     Args:
         host_base: WebSocket URL base (without session_id)
-        audio_data: Pre-loaded audio data
+        audio_clips: Pre-loaded A-law clips, assigned to streams round-robin
         num_streams: Number of concurrent streams
         chunk_duration: Duration per chunk in seconds
         stagger_delay: Delay between starting each stream (0 = simultaneous)
         verbose: Print per-stream progress
+        connect_concurrency: Maximum number of handshakes in flight at once
+        enable_compression: Negotiate permessage-deflate on each connection
+        keepalive: Send WebSocket keepalive pings on each connection
     
     Returns:
         List of StreamStats for each stream
     """
     tasks = []
+    clip_chunks = [split_audio_chunks(clip, chunk_duration) for clip in audio_clips]
+    connect_sem = asyncio.Semaphore(connect_concurrency)
     
     print(f"\n{'='*60}")
     print(f"Starting {num_streams} concurrent streams")
@@ -338,11 +495,16 @@ async def run_concurrent_streams(
     
     start_time = time.time()
     
+    # One timestamp per run; the stream index keeps IDs unique within it.
+    run_ts = int(start_time * 1000)
     for i in range(num_streams):
-        stream_id = f"concurrent-test-{i+1:03d}-{int(time.time()*1000)}"
+        stream_id = f"concurrent-test-{i+1:03d}-{run_ts}"
         
         task = asyncio.create_task(
-            run_single_stream(stream_id, host_base, audio_data, chunk_duration, verbose)
+            run_single_stream(
+                stream_id, host_base, clip_chunks[i % len(clip_chunks)], chunk_duration,
+                connect_sem, verbose, enable_compression, keepalive
+            )
         )
         tasks.append(task)
         
@@ -369,15 +531,31 @@ async def run_concurrent_streams(
     return stats_list, total_time
 
 
+_SUMMARY_DTYPE = np.dtype([
+    ("chunks", np.int64),
+    ("messages", np.int64),
+    ("partials", np.int64),
+    ("finals", np.int64),
+    ("duration", np.float64),
+])
+
+_STATUS_LABELS = {
+    "successful": "OK",
+    "overloaded": "OVERLOAD",
+    "failed": "FAILED",
+}
+
+
 def print_summary(stats_list: list[StreamStats], total_time: float) -> None:
     """Prints a summary of all stream results."""
     print(f"\n{'='*60}")
     print("CONCURRENT STREAMS SUMMARY")
     print(f"{'='*60}")
     
-    overloaded = [s for s in stats_list if classify_stream(s) == "overloaded"]
-    successful = [s for s in stats_list if classify_stream(s) == "successful"]
-    failed = [s for s in stats_list if classify_stream(s) == "failed"]
+    statuses = [classify_stream(s) for s in stats_list]
+    overloaded = [s for s, status in zip(stats_list, statuses) if status == "overloaded"]
+    successful = [s for s, status in zip(stats_list, statuses) if status == "successful"]
+    failed = [s for s, status in zip(stats_list, statuses) if status == "failed"]
     
     print(f"\nTotal Streams:    {len(stats_list)}")
     print(f"Successful:       {len(successful)}")
@@ -386,12 +564,20 @@ def print_summary(stats_list: list[StreamStats], total_time: float) -> None:
     print(f"Total Time:       {total_time:.2f}s")
     
     if successful:
-        total_chunks = sum(s.chunks_sent for s in successful)
-        total_messages = sum(s.messages_received for s in successful)
-        total_partials = sum(s.partials_received for s in successful)
-        total_finals = sum(s.finals_received for s in successful)
+        # One pass into a structured array, then vectorized column sums.
+        totals = np.array(
+            [
+                (s.chunks_sent, s.messages_received, s.partials_received, s.finals_received, s.duration)
+                for s in successful
+            ],
+            dtype=_SUMMARY_DTYPE,
+        )
+        total_chunks = int(totals["chunks"].sum())
+        total_messages = int(totals["messages"].sum())
+        total_partials = int(totals["partials"].sum())
+        total_finals = int(totals["finals"].sum())
         total_errors = sum(s.errors_received for s in stats_list)
-        avg_duration = sum(s.duration for s in successful) / len(successful)
+        avg_duration = float(totals["duration"].mean())
         
         print(f"\n--- Successful Streams ---")
         print(f"Total Chunks Sent:      {total_chunks}")
@@ -418,13 +604,8 @@ def print_summary(stats_list: list[StreamStats], total_time: float) -> None:
     print(f"\n--- Per-Stream Details ---")
     print(f"{'Stream ID':<40} {'Chunks':>8} {'Msgs':>8} {'Close':>8} {'Duration':>10} {'Status':>10}")
     print("-" * 90)
-    for s in stats_list:
-        if s in overloaded:
-            status = "OVERLOAD"
-        elif s in successful:
-            status = "OK"
-        else:
-            status = "FAILED"
+    for s, status_key in zip(stats_list, statuses):
+        status = _STATUS_LABELS[status_key]
         close_code = str(s.close_code) if s.close_code is not None else "-"
         print(
             f"{s.stream_id:<40} {s.chunks_sent:>8} {s.messages_received:>8} "
@@ -446,11 +627,15 @@ Examples:
   # Run 10 streams with 0.5s stagger
   python scripts/simulate_concurrent_streams.py --file test_audio.wav --num_streams 10 --stagger 0.5
   
+  # Cycle streams through several clips
+  python scripts/simulate_concurrent_streams.py --file "clips/*.wav" --num_streams 20
+  
   # Run with verbose output
   python scripts/simulate_concurrent_streams.py --file test_audio.wav --num_streams 3 --verbose
         """
     )
-    parser.add_argument("--file", default="test_audio.wav", help="Path to input audio file")
+    parser.add_argument("--file", default="test_audio.wav",
+                        help="Path or glob of input audio files; streams cycle through matches")
     parser.add_argument("--host", default="ws://localhost:8000/ws/transcribe", 
                         help="WebSocket URL base (without session_id)")
     parser.add_argument("--num_streams", type=int, default=5, 
@@ -459,34 +644,49 @@ Examples:
                         help="Chunk duration in seconds (default: 0.6)")
     parser.add_argument("--stagger", type=float, default=0.0, 
                         help="Delay between starting each stream in seconds (default: 0, simultaneous)")
+    parser.add_argument("--connect_concurrency", type=int, default=32,
+                        help="Maximum simultaneous connection handshakes (default: 32)")
+    parser.add_argument("--enable_compression", action="store_true",
+                        help="Negotiate permessage-deflate (off by default; A-law does not compress)")
+    parser.add_argument("--keepalive", action="store_true",
+                        help="Send keepalive pings (off by default; enable for streams over ~20s)")
     parser.add_argument("--verbose", "-v", action="store_true", 
                         help="Print per-stream progress")
     parser.add_argument("--json-output", help="Path to write structured JSON report")
     
     args = parser.parse_args()
     
-    # Validate audio file
-    if not os.path.exists(args.file):
+    # Validate audio files
+    file_list = sorted(glob.glob(args.file))
+    if not file_list:
         print(f"Error: Audio file not found: {args.file}")
         sys.exit(1)
     
+    if args.connect_concurrency < 1:
+        print("Error: --connect_concurrency must be at least 1")
+        sys.exit(1)
+    
     # Pre-load audio data
-    print(f"Loading audio file: {args.file}...")
+    print(f"Loading {len(file_list)} audio file(s): {args.file}...")
     try:
-        audio_data = load_audio_data(args.file)
-        print(f"Audio loaded: {len(audio_data)} bytes ({len(audio_data)/8000:.2f}s at 8kHz)")
+        audio_clips = load_audio_files(file_list)
     except Exception as e:
         print(f"Error loading audio: {e}")
         sys.exit(1)
+    for audio_file, audio_data in zip(file_list, audio_clips):
+        print(f"Audio loaded: {audio_file}: {len(audio_data)} bytes ({len(audio_data)/8000:.2f}s at 8kHz)")
     
     # Run concurrent streams
     stats_list, total_time = await run_concurrent_streams(
         host_base=args.host,
-        audio_data=audio_data,
+        audio_clips=audio_clips,
         num_streams=args.num_streams,
         chunk_duration=args.chunk_duration,
         stagger_delay=args.stagger,
-        verbose=args.verbose
+        verbose=args.verbose,
+        connect_concurrency=args.connect_concurrency,
+        enable_compression=args.enable_compression,
+        keepalive=args.keepalive
     )
     
     # Print summary
@@ -497,4 +697,11 @@ Examples:
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    # uvloop cuts per-task and timer overhead when driving many streams;
+    # it is not available on Windows.
+    try:
+        import uvloop
+    except ImportError:
+        asyncio.run(main())
+    else:
+        uvloop.run(main())
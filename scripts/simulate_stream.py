@@ -10,18 +10,17 @@ import argparse
 import asyncio
 import sys
 import numpy as np
+import orjson
 import websockets
-import json
 import time
 import os
-import struct
+from pathlib import Path
 from dotenv import load_dotenv
 
-load_dotenv()
-
 try:
     import soundfile as sf
     import librosa
+    import soxr
 except ImportError:
     print("Error: Please install required libraries via 'pip install -r requirements.txt'")
     sys.exit(1)
@@ -33,78 +32,46 @@ except ImportError:
     print("Error: 'g711' library not found. Install it via 'pip install g711'.")
     sys.exit(1)
 
+ROOT_DIR = Path(__file__).resolve().parents[1]
+
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from scripts._stream_common import (
+    convert_to_alaw,
+    convert_to_ulaw,
+    float_to_pcm16,
+    iter_pcm16_blocks,
+    parse_wav_header,
+)
+
+# Number of chunks read ahead of the sender.
+PREFETCH_CHUNKS = 3
+
 def encode_g711(pcm_data_int16, audio_format):
     """
     Convert 16-bit PCM (numpy int16 array) to G.711 bytes.
     """
     if audio_format == "ulaw":
-        encoder_name = "encode_ulaw"
-    else:
-        encoder_name = "encode_alaw"
+        return convert_to_ulaw(pcm_data_int16)
+    return convert_to_alaw(pcm_data_int16)
 
-    encoder = getattr(g711, encoder_name, None)
-    if encoder is None:
-        raise RuntimeError(f"g711.{encoder_name} is not available. Install or update the 'g711' package.")
-
-    # Some g711 libs take raw bytes, some take samples.
-    # We'll assume it might take bytes of PCM.
-    try:
-        return encoder(pcm_data_int16.tobytes())
-    except Exception:
-        # If it expects an iterable of ints
-        return encoder(pcm_data_int16.tolist())
-
-def parse_wav_header(file_path):
+def read_span(audio_file, offset=0, length=-1):
     """
-    Parses WAV header to determine if it's G.711 A-law (Format=6), μ-law (Format=7), or PCM (Format=1).
-    Returns (format_str, sample_rate, data_start_offset, data_length)
-    format_str: "alaw", "ulaw", "pcm16le", or "" if unknown.
+    Reads length bytes starting at offset (the rest of the file by default)
+    in a single call.
     """
-    try:
-        with open(file_path, 'rb') as f:
-            # RIFF header
-            chunk_id, size, format_tag = struct.unpack('<4sI4s', f.read(12))
-            if chunk_id != b'RIFF' or format_tag != b'WAVE':
-                return "", 0, 0, 0
-            
-            # Find chunks
-            while True:
-                chunk_header = f.read(8)
-                if len(chunk_header) < 8:
-                    break
-                subchunk_id, subchunk_size = struct.unpack('<4sI', chunk_header)
-                
-                if subchunk_id == b'fmt ':
-                    # Parse fmt chunk
-                    fmt_data = f.read(subchunk_size)
-                    audio_format, num_channels, sample_rate, byte_rate, block_align, bits_per_sample = struct.unpack('<HHIIHH', fmt_data[:16])
-                    
-                    if audio_format == 6 and num_channels == 1 and bits_per_sample == 8:
-                        fmt = "alaw"
-                    elif audio_format == 7 and num_channels == 1 and bits_per_sample == 8:
-                        fmt = "ulaw"
-                    elif audio_format == 1 and num_channels == 1 and bits_per_sample == 16:
-                        fmt = "pcm16le"
-                    else:
-                        fmt = ""
-                    
-                    if subchunk_size > 16:
-                        # Skip extra bytes if any (though we read subchunk_size above? No we read subchunk_size bytes? 
-                        # Wait, f.read(subchunk_size) reads ALL content. correct.)
-                        pass
+    with open(audio_file, 'rb') as f:
+        f.seek(offset)
+        return f.read(length)
 
-                elif subchunk_id == b'data':
-                    # Found data
-                    data_start = f.tell()
-                    return (locals().get('fmt', ""), locals().get('sample_rate', 0), data_start, subchunk_size)
-                else:
-                    # Skip other chunks
-                    f.seek(subchunk_size, 1)
-                    
-    except Exception as e:
-        print(f"Header parse error: {e}")
-    
-    return "", 0, 0, 0
+def slice_chunks(data, chunk_size):
+    """
+    Yields chunk_size memoryview slices of data; the last may be shorter.
+    """
+    view = memoryview(data)
+    for offset in range(0, len(view), chunk_size):
+        yield view[offset:offset + chunk_size]
 
 async def get_audio_generator(audio_file, chunk_duration, audio_format, sample_rate):
     """
@@ -123,24 +90,18 @@ async def get_audio_generator(audio_file, chunk_duration, audio_format, sample_r
             print(f"Error: Raw G.711 file is {detected_format}, but --format is {audio_format}.")
             return
         print(f"Detected raw G.711 {detected_format}: {audio_file}")
-        with open(audio_file, 'rb') as f:
-            while True:
-                data = f.read(chunk_size)
-                if not data:
-                    break
-                yield data
+        data = await asyncio.to_thread(read_span, audio_file)
+        for chunk in slice_chunks(data, chunk_size):
+            yield chunk
         return
     if ext in ['.pcm', '.raw']:
         if audio_format != "pcm16le":
             print("Error: Raw PCM file requires --format pcm16le.")
             return
         print(f"Detected raw PCM16LE file: {audio_file}")
-        with open(audio_file, 'rb') as f:
-            while True:
-                data = f.read(chunk_size)
-                if not data:
-                    break
-                yield data
+        data = await asyncio.to_thread(read_span, audio_file)
+        for chunk in slice_chunks(data, chunk_size):
+            yield chunk
         return
 
     # 2. Check WAV header
@@ -152,78 +113,135 @@ async def get_audio_generator(audio_file, chunk_duration, audio_format, sample_r
         if wav_sr != sample_rate:
             print(f"Warning: WAV sample rate is {wav_sr}, but --sample_rate is {sample_rate}.")
         print(f"Detected G.711 {wav_format} WAV: {audio_file} (passing through)")
-        with open(audio_file, 'rb') as f:
-            f.seek(data_offset)
-            read_bytes = 0
-            while read_bytes < data_len:
-                # Determine read size
-                bytes_to_read = min(chunk_size, data_len - read_bytes)
-                if bytes_to_read == 0:
-                    break
-                data = f.read(bytes_to_read)
-                if not data:
-                    break
-                yield data
-                read_bytes += len(data)
+        data = await asyncio.to_thread(read_span, audio_file, data_offset, data_len)
+        for chunk in slice_chunks(data, chunk_size):
+            yield chunk
         return
     if wav_format == "pcm16le" and audio_format == "pcm16le":
         if wav_sr != sample_rate:
             print(f"Warning: WAV sample rate is {wav_sr}, but --sample_rate is {sample_rate}.")
+        else:
+            print(f"Detected PCM16LE WAV: {audio_file} (passing through)")
+            data = await asyncio.to_thread(read_span, audio_file, data_offset, data_len)
+            for chunk in slice_chunks(data, chunk_size):
+                yield chunk
+            return
 
-    # 3. Fallback to Librosa/Conversion (Standard PCM/Audio)
+    # 3. Decode and resample (Standard PCM/Audio)
     print(f"Processing as PCM audio: {audio_file}...")
+    pending = b""
     try:
-        # Load and Resample
-        y, sr = librosa.load(audio_file, sr=sample_rate)
+        async for encoded in iter_encoded_blocks(audio_file, audio_format, sample_rate):
+            data = pending + encoded if pending else encoded
+            # Slice a memoryview so each chunk is a view, not a copy; a
+            # partial chunk carries over to the next block.
+            view = memoryview(data)
+            usable = len(data) - len(data) % chunk_size
+            for offset in range(0, usable, chunk_size):
+                yield view[offset:offset + chunk_size]
+            pending = data[usable:]
     except Exception as e:
         print(f"Failed to load audio: {e}")
         return
 
-    # Convert to Int16
-    pcm_data = (y * 32767).astype(np.int16)
+    if pending:
+        yield pending
 
+def _encode_pcm16(pcm_data, audio_format):
+    """
+    Encodes int16 samples for the wire format.
+    """
     if audio_format in ("alaw", "ulaw"):
-        # Encode
-        raw_bytes = encode_g711(pcm_data, audio_format)
-        total_len = len(raw_bytes)
-        offset = 0
-        while offset < total_len:
-            end = min(offset + chunk_size, total_len)
-            yield raw_bytes[offset:end]
-            offset = end
-    else:
-        # PCM16LE bytes
-        raw_bytes = pcm_data.tobytes()
-        total_len = len(raw_bytes)
-        offset = 0
-        while offset < total_len:
-            end = min(offset + chunk_size, total_len)
-            yield raw_bytes[offset:end]
-            offset = end
+        return encode_g711(pcm_data, audio_format)
+    # PCM16LE bytes
+    return pcm_data.tobytes()
+
+def _next_encoded_block(blocks, audio_format):
+    """
+    Decodes and encodes the next block, or returns None when exhausted.
+    """
+    block = next(blocks, None)
+    if block is None:
+        return None
+    return _encode_pcm16(block, audio_format)
+
+def _load_encoded(audio_file, audio_format, sample_rate):
+    """
+    Decodes a whole file with librosa and encodes it.
+    """
+    y, sr = librosa.load(audio_file, sr=sample_rate, dtype=np.float32)
+    # Convert to Int16, saturating instead of wrapping on clipped input
+    return _encode_pcm16(float_to_pcm16(y), audio_format)
+
+async def iter_encoded_blocks(audio_file, audio_format, sample_rate):
+    """
+    Yields encoded audio block by block.
+    Decoding, resampling and encoding run in a worker thread so the event
+    loop keeps sending and receiving while the next block is converted.
+    """
+    # libsndfile + soxr, converted block by block
+    blocks = iter_pcm16_blocks(audio_file, sample_rate)
+    try:
+        try:
+            encoded = await asyncio.to_thread(_next_encoded_block, blocks, audio_format)
+        except sf.LibsndfileError:
+            # Formats libsndfile cannot open still go through librosa's loaders.
+            yield await asyncio.to_thread(_load_encoded, audio_file, audio_format, sample_rate)
+            return
+
+        while encoded is not None:
+            yield encoded
+            encoded = await asyncio.to_thread(_next_encoded_block, blocks, audio_format)
+    finally:
+        blocks.close()
+
+async def prefetch_chunks(chunk_generator, queue):
+    """
+    Reads chunks ahead of the sender into a bounded queue.
+    Puts None once the generator is exhausted or fails.
+    """
+    try:
+        async for chunk in chunk_generator:
+            await queue.put(chunk)
+    except Exception:
+        await queue.put(None)
+        raise
+    await queue.put(None)
 
 async def send_audio(websocket, audio_file, chunk_duration, audio_format, sample_rate):
     """
     Streams audio chunks to WebSocket.
+    The next chunks are read ahead so sends never wait on file I/O.
     """
     print(f"Preparing stream for {audio_file}...")
     
     chunk_generator = get_audio_generator(audio_file, chunk_duration, audio_format, sample_rate)
+    queue = asyncio.Queue(maxsize=PREFETCH_CHUNKS)
+    producer = asyncio.create_task(prefetch_chunks(chunk_generator, queue))
     
     start_time = time.time()
     chunk_count = 0
+    loop = asyncio.get_running_loop()
+    deadline = loop.time()
     
     try:
-        async for chunk in chunk_generator:
+        while (chunk := await queue.get()) is not None:
             await websocket.send(chunk)
             chunk_count += 1
             
-            # Real-time simulation sleep
-            await asyncio.sleep(chunk_duration)
-            
+            # Real-time simulation: sleep until the next chunk's deadline so
+            # send and encode time do not accumulate as drift.
+            deadline += chunk_duration
+            await asyncio.sleep(max(0.0, deadline - loop.time()))
+        
+        # Surface any error that ended the generator early.
+        await producer
         print(f"\nFinished sending audio. Chunks sent: {chunk_count}")
         
     except Exception as e:
         print(f"\nSend error: {e}")
+    finally:
+        producer.cancel()
 
 async def receive_results(websocket):
     """
@@ -231,8 +249,9 @@ async def receive_results(websocket):
     """
     try:
         while True:
-            message = await websocket.recv()
-            data = json.loads(message)
+            # orjson parses the raw frame, so skip the UTF-8 decode to str.
+            message = await websocket.recv(decode=False)
+            data = orjson.loads(message)
             
             msg_type = data.get("type", "unknown")
             text = data.get("text", "")
@@ -246,6 +265,8 @@ async def receive_results(websocket):
         print(f"Receive error: {e}")
 
 async def main():
+    load_dotenv()
+
     parser = argparse.ArgumentParser(description="Simulate WebSocket Audio Stream")
     parser.add_argument("--file", default="test_audio.wav", help="Path to input audio file")
     parser.add_argument("--host", default="ws://localhost:8000/ws/transcribe/test-session-1", help="WebSocket URL")
@@ -263,7 +284,8 @@ async def main():
     print(f"Connecting to {args.host}...")
     
     try:
-        async with websockets.connect(args.host) as websocket:
+        # A-law audio does not compress, so skip permessage-deflate.
+        async with websockets.connect(args.host, compression=None, max_size=None) as websocket:
             print("Connected.")
             
             # Run send and receive in parallel
@@ -287,4 +309,10 @@ async def main():
         print(f"Connection failed: {e}")
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    # uvloop cuts per-send and timer overhead; it is not available on Windows.
+    try:
+        import uvloop
+    except ImportError:
+        asyncio.run(main())
+    else:
+        uvloop.run(main())
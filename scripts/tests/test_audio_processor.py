@@ -4,6 +4,7 @@ import sys
 import unittest
 from pathlib import Path
 
+import g711
 import numpy as np
 
 ROOT_DIR = Path(__file__).resolve().parents[2]
@@ -49,6 +50,28 @@ class AudioProcessorTests(unittest.TestCase):
             np.array([-1.0, -0.5, 0.0, 0.5, 32767.0 / 32768.0], dtype=np.float32),
         )
 
+    def test_g711_process_matches_reference_decoder(self) -> None:
+        """Table-based G.711 decoding should match g711 for every code."""
+        codes = bytes(range(256))
+        for input_format, decoder in (("alaw", g711.decode_alaw), ("ulaw", g711.decode_ulaw)):
+            with self.subTest(input_format=input_format):
+                processor = self.make_processor(input_format=input_format, source_rate=16000)
+
+                result = processor.process(codes)
+
+                self.assert_float32_mono_contiguous(result)
+                np.testing.assert_array_equal(result, decoder(codes))
+
+    def test_g711_8k_fused_path_matches_decode_then_resample(self) -> None:
+        """Decoding into the upsample buffer gives the same result as two steps."""
+        processor = self.make_processor(input_format="alaw", source_rate=8000)
+        codes = bytes(range(256))
+
+        result = processor.process(codes)
+
+        self.assert_float32_mono_contiguous(result)
+        np.testing.assert_array_equal(result, processor.resample(g711.decode_alaw(codes)))
+
     def test_pcm16le_8k_process_resamples_to_16k_float32(self) -> None:
         """PCM16LE at 8 kHz should resample to the 16 kHz target contract."""
         processor = self.make_processor(source_rate=8000)
@@ -59,6 +82,53 @@ class AudioProcessorTests(unittest.TestCase):
         self.assert_float32_mono_contiguous(result)
         self.assertEqual(result.shape, (8,))
 
+    def test_resample_8k_keeps_input_samples_and_interpolates_between(self) -> None:
+        """2x upsampling keeps input samples and tracks a band-limited tone."""
+        processor = self.make_processor(source_rate=8000)
+        tone = np.sin(2 * np.pi * 300 * np.arange(800) / 8000).astype(np.float32)
+
+        result = processor.resample(tone)
+
+        self.assert_float32_mono_contiguous(result)
+        np.testing.assert_array_equal(result[0::2], tone)
+        expected = np.sin(2 * np.pi * 300 * np.arange(1600) / 16000)
+        np.testing.assert_allclose(result[40:-40], expected[40:-40], atol=5e-3)
+        np.testing.assert_allclose(
+            processor.resample(np.full(10, 0.25, dtype=np.float32)),
+            np.full(20, 0.25, dtype=np.float32),
+            rtol=1e-6,
+        )
+
+    def test_chunked_resample_with_state_matches_whole_signal(self) -> None:
+        """Resampling chunk by chunk with state leaves no seams at boundaries."""
+        processor = self.make_processor(source_rate=8000)
+        tone = np.sin(2 * np.pi * 300 * np.arange(800) / 8000).astype(np.float32)
+        whole = processor.resample(tone)
+
+        state = audio.ResampleState()
+        chunked = np.concatenate([
+            processor.resample(tone[start:start + size], state)
+            for start, size in zip((0, 5, 165, 325, 326), (5, 160, 160, 1, 474))
+        ])
+
+        self.assert_float32_mono_contiguous(chunked)
+        # Output lags by half the filter span; the tail waits for more input.
+        self.assertEqual(chunked.size, whole.size - 2 * audio._UPSAMPLE_HALF_TAPS)
+        np.testing.assert_allclose(chunked, whole[:chunked.size], atol=1e-6)
+
+    def test_g711_8k_fused_path_with_state_matches_resample(self) -> None:
+        """The fused G.711 path continues resampler state like resample()."""
+        processor = self.make_processor(input_format="alaw", source_rate=8000)
+        codes = bytes(range(256))
+        process_state = audio.ResampleState()
+        resample_state = audio.ResampleState()
+
+        for chunk in (codes[:100], codes[100:]):
+            np.testing.assert_array_equal(
+                processor.process(chunk, process_state),
+                processor.resample(g711.decode_alaw(chunk), resample_state),
+            )
+
     def test_process_empty_chunk_returns_empty_float32_array(self) -> None:
         """Empty chunks should return an empty one-dimensional float32 array."""
         processor = self.make_processor(source_rate=8000)
@@ -94,6 +164,30 @@ class AudioProcessorTests(unittest.TestCase):
         self.assert_float32_mono_contiguous(result)
         np.testing.assert_allclose(result, np.array([0.0, -0.25], dtype=np.float32))
 
+    def test_debug_timing_follows_root_log_level(self) -> None:
+        """Per-chunk timing is enabled only when the root logger is at DEBUG."""
+        root = audio.logging.getLogger()
+        original_level = root.level
+        self.addCleanup(root.setLevel, original_level)
+
+        root.setLevel(audio.logging.INFO)
+        self.assertFalse(self.make_processor()._debug)
+
+        root.setLevel(audio.logging.DEBUG)
+        processor = self.make_processor(input_format="alaw", source_rate=8000)
+        self.assertTrue(processor._debug)
+        self.assert_float32_mono_contiguous(processor.process(b"\xd5" * 80))
+
+    def test_create_audio_executor_uses_configured_worker_count(self) -> None:
+        """The audio executor should be sized from AUDIO_PROCESSING_WORKERS."""
+        self.override_attr(audio.settings, "AUDIO_PROCESSING_WORKERS", 3)
+
+        executor = audio.create_audio_executor(audio.settings)
+        self.addCleanup(executor.shutdown)
+
+        self.assertEqual(executor._max_workers, 3)
+        self.assertEqual(executor._thread_name_prefix, "audio-dsp")
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 import asyncio
+import json
 import sys
 import tempfile
 import threading
@@ -20,6 +21,7 @@ if str(ROOT_DIR) not in sys.path:
 
 from api import endpoints
 from core import config
+from core.context import session_id_ctx
 from services import inference
 
 
@@ -52,11 +54,11 @@ class FakeRecognizer:
         return self.stream
 
     def is_ready(self, stream: FakeStream) -> bool:
-        """Return ready once so infer exercises decode_stream."""
+        """Return ready once so infer exercises decode_streams."""
         self.ready_calls += 1
         return self.ready_calls == 1
 
-    def decode_stream(self, stream: FakeStream) -> None:
+    def decode_streams(self, streams: list[FakeStream]) -> None:
         """Track decode calls."""
         self.decode_calls += 1
 
@@ -73,6 +75,42 @@ class FakeRecognizer:
         self.reset_calls += 1
 
 
+class DecodeInterrupted(BaseException):
+    """Non-``Exception`` error raised out of a decode, like KeyboardInterrupt."""
+
+
+class BatchingRecognizer:
+    """Recognizer double that records decode_streams batches.
+
+    Each stream has one ready frame. The first batch blocks until ``gate`` is
+    set so other callers can queue up behind it.
+    """
+
+    def __init__(self, fail: bool = False, interrupt: bool = False) -> None:
+        """Initialize batch recording."""
+        self.frames: dict[str, int] = {}
+        self.batches: list[list[str]] = []
+        self.gate = threading.Event()
+        self.fail = fail
+        self.interrupt = interrupt
+
+    def is_ready(self, stream: str) -> bool:
+        """Report whether the stream still has a frame to decode."""
+        return self.frames.get(stream, 1) > 0
+
+    def decode_streams(self, streams: list[str]) -> None:
+        """Record the batch and consume one frame per stream."""
+        self.batches.append(list(streams))
+        if len(self.batches) == 1:
+            self.gate.wait(timeout=2.0)
+        if self.fail:
+            raise RuntimeError("decode failed")
+        if self.interrupt:
+            raise DecodeInterrupted()
+        for stream in streams:
+            self.frames[stream] = 0
+
+
 class FakeWebSocket:
     """Minimal WebSocket test double for overload responses."""
 
@@ -82,9 +120,9 @@ class FakeWebSocket:
         self.close_code: int | None = None
         self.close_reason: str = ""
 
-    async def send_json(self, payload: dict[str, object]) -> None:
-        """Capture sent JSON."""
-        self.messages.append(payload)
+    async def send_text(self, data: str) -> None:
+        """Capture sent JSON text."""
+        self.messages.append(json.loads(data))
 
     async def close(self, code: int, reason: str) -> None:
         """Capture close metadata."""
@@ -124,6 +162,27 @@ class InferenceBackpressureTests(unittest.TestCase):
         self.assertEqual(settings.ASR_INFERENCE_WORKERS, 4)
         self.assertEqual(settings.ASR_INFERENCE_QUEUE_SIZE, 16)
         self.assertEqual(settings.ASR_INFERENCE_QUEUE_TIMEOUT_SECONDS, 20.0)
+        self.assertEqual(settings.ASR_MODEL_NUM_THREADS, 4)
+        self.assertEqual(settings.ASR_PARALLEL_BATCHES, 2)
+
+    def test_parallel_batches_default_scales_with_cores(self) -> None:
+        """Parallel batches should fill the cores, capped by inference workers."""
+        self.override_attr(config.os, "cpu_count", lambda: 32)
+
+        settings = config.get_settings(self.write_env())
+        self.assertEqual(settings.ASR_PARALLEL_BATCHES, 8)
+
+        settings = config.get_settings(self.write_env("ASR_INFERENCE_WORKERS=4"))
+        self.assertEqual(settings.ASR_PARALLEL_BATCHES, 4)
+
+    def test_asr_model_threads_default_fits_small_hosts(self) -> None:
+        """The model thread default should not exceed the CPU count."""
+        self.override_attr(config.os, "cpu_count", lambda: 2)
+
+        settings = config.get_settings(self.write_env())
+
+        self.assertEqual(settings.ASR_MODEL_NUM_THREADS, 2)
+        self.assertEqual(settings.ASR_PARALLEL_BATCHES, 1)
 
     def test_asr_inference_settings_validate_bounds(self) -> None:
         """Invalid ASR inference settings should fail validation."""
@@ -131,6 +190,7 @@ class InferenceBackpressureTests(unittest.TestCase):
             "ASR_INFERENCE_WORKERS=0",
             "ASR_INFERENCE_QUEUE_SIZE=-1",
             "ASR_INFERENCE_QUEUE_TIMEOUT_SECONDS=0",
+            "ASR_MODEL_NUM_THREADS=0",
         ]
 
         for line in invalid_lines:
@@ -328,6 +388,78 @@ class InferenceBackpressureTests(unittest.TestCase):
 
         asyncio.run(scenario())
 
+    def test_inference_service_normalizes_samples_once(self) -> None:
+        """Flat float32 input passes through; other layouts become flat float32."""
+        async def scenario(samples: np.ndarray) -> np.ndarray:
+            executor = inference.BoundedInferenceExecutor(
+                max_workers=1,
+                queue_size=1,
+                queue_timeout_seconds=1.0,
+            )
+            recognizer = FakeRecognizer()
+            service = inference.ASRInferenceService(recognizer, executor)
+            try:
+                await service.infer(samples)
+            finally:
+                executor.shutdown()
+            return recognizer.stream.accepted_samples
+
+        flat = np.array([0.1, 0.2], dtype=np.float32)
+        self.assertIs(asyncio.run(scenario(flat)), flat)
+
+        accepted = asyncio.run(scenario(np.array([[0.1, 0.2]], dtype=np.float64)))
+        self.assertEqual(accepted.dtype, np.float32)
+        self.assertEqual(accepted.shape, (2,))
+        self.assertTrue(accepted.flags.c_contiguous)
+
+    def test_inference_service_runs_with_connection_context(self) -> None:
+        """Worker calls see the correlation IDs bound when the service was created."""
+        seen: list[str] = []
+
+        class ContextRecordingStream(FakeStream):
+            def accept_waveform(self, sample_rate: int, samples: np.ndarray) -> None:
+                seen.append(session_id_ctx.get())
+
+        async def scenario() -> None:
+            executor = inference.BoundedInferenceExecutor(
+                max_workers=1,
+                queue_size=1,
+                queue_timeout_seconds=1.0,
+            )
+            recognizer = FakeRecognizer()
+            recognizer.stream = ContextRecordingStream()
+            token = session_id_ctx.set("ctx-session")
+            try:
+                service = inference.ASRInferenceService(recognizer, executor)
+            finally:
+                session_id_ctx.reset(token)
+            try:
+                for _ in range(2):
+                    await service.infer(np.zeros(2, dtype=np.float32))
+            finally:
+                executor.shutdown()
+
+        asyncio.run(scenario())
+
+        self.assertEqual(seen, ["ctx-session", "ctx-session"])
+
+    def test_inference_service_rejects_non_array_input(self) -> None:
+        """Only numpy arrays satisfy the AudioProcessor output contract."""
+        async def scenario() -> None:
+            executor = inference.BoundedInferenceExecutor(
+                max_workers=1,
+                queue_size=1,
+                queue_timeout_seconds=1.0,
+            )
+            service = inference.ASRInferenceService(FakeRecognizer(), executor)
+            try:
+                with self.assertRaises(ValueError):
+                    await service.infer([0.1, 0.2])
+            finally:
+                executor.shutdown()
+
+        asyncio.run(scenario())
+
     def test_websocket_overload_helper_sends_error_and_1013_close(self) -> None:
         """Overload helper should send the documented error event and close code."""
         async def scenario() -> FakeWebSocket:
@@ -352,5 +484,108 @@ class InferenceBackpressureTests(unittest.TestCase):
         self.assertEqual(websocket.close_reason, inference.INFERENCE_OVERLOAD_CLOSE_REASON)
 
 
+class StreamBatchDecoderTests(unittest.TestCase):
+    """Test cross-session batching of stream decodes."""
+
+    def run_concurrently(
+        self,
+        decoder: inference.StreamBatchDecoder,
+        recognizer: BatchingRecognizer,
+    ) -> dict[str, BaseException | None]:
+        """Decode three streams, queuing the last two behind the first batch."""
+        errors: dict[str, BaseException | None] = {}
+
+        def worker(stream: str) -> None:
+            try:
+                decoder.decode(stream)
+            except BaseException as exc:
+                errors[stream] = exc
+            else:
+                errors[stream] = None
+
+        first = threading.Thread(target=worker, args=("a",))
+        first.start()
+        deadline = time.monotonic() + 2.0
+        while not recognizer.batches and time.monotonic() < deadline:
+            time.sleep(0.001)
+
+        others = [threading.Thread(target=worker, args=(name,)) for name in ("b", "c")]
+        for thread in others:
+            thread.start()
+        while len(decoder._waiting) < 2 and time.monotonic() < deadline:
+            time.sleep(0.001)
+        recognizer.gate.set()
+
+        for thread in [first, *others]:
+            thread.join(timeout=2.0)
+            self.assertFalse(thread.is_alive())
+        return errors
+
+    def test_waiting_streams_are_decoded_in_one_batch(self) -> None:
+        """Streams queued behind a running batch share the next decode_streams call."""
+        recognizer = BatchingRecognizer()
+        decoder = inference.StreamBatchDecoder(recognizer)
+
+        errors = self.run_concurrently(decoder, recognizer)
+
+        self.assertEqual(errors, {"a": None, "b": None, "c": None})
+        self.assertEqual(recognizer.batches, [["a"], ["b", "c"]])
+        self.assertEqual(decoder._leaders, 0)
+
+    def test_parallel_batches_decode_at_the_same_time(self) -> None:
+        """A second caller leads its own batch while the first is still running."""
+        recognizer = BatchingRecognizer()
+        decoder = inference.StreamBatchDecoder(recognizer, max_batches=2)
+
+        threads = [
+            threading.Thread(target=decoder.decode, args=(name,))
+            for name in ("a", "b")
+        ]
+        threads[0].start()
+        deadline = time.monotonic() + 2.0
+        while not recognizer.batches and time.monotonic() < deadline:
+            time.sleep(0.001)
+        threads[1].start()
+        while len(recognizer.batches) < 2 and time.monotonic() < deadline:
+            time.sleep(0.001)
+
+        self.assertEqual(recognizer.batches, [["a"], ["b"]])
+        recognizer.gate.set()
+        for thread in threads:
+            thread.join(timeout=2.0)
+            self.assertFalse(thread.is_alive())
+        self.assertEqual(decoder._leaders, 0)
+
+    def test_batch_error_is_raised_in_every_member(self) -> None:
+        """A failed batch surfaces its error to each caller in it."""
+        recognizer = BatchingRecognizer(fail=True)
+        decoder = inference.StreamBatchDecoder(recognizer)
+
+        errors = self.run_concurrently(decoder, recognizer)
+
+        self.assertEqual(set(errors), {"a", "b", "c"})
+        self.assertTrue(all(isinstance(exc, RuntimeError) for exc in errors.values()))
+        self.assertEqual(decoder._leaders, 0)
+
+    def test_interrupted_leader_releases_waiting_callers(self) -> None:
+        """A BaseException out of a batch must not leave the decoder blocked."""
+        recognizer = BatchingRecognizer(interrupt=True)
+        decoder = inference.StreamBatchDecoder(recognizer)
+
+        errors = self.run_concurrently(decoder, recognizer)
+
+        self.assertIsInstance(errors["a"], DecodeInterrupted)
+        self.assertIsInstance(errors["b"], DecodeInterrupted)
+        self.assertIsInstance(errors["c"], RuntimeError)
+        self.assertEqual(decoder._leaders, 0)
+
+        recognizer.interrupt = False
+        later = threading.Thread(target=decoder.decode, args=("d",))
+        later.start()
+        later.join(timeout=2.0)
+        self.assertFalse(later.is_alive())
+        self.assertEqual(recognizer.batches[-1], ["d"])
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -74,6 +74,7 @@ class InferenceModelPathTests(unittest.TestCase):
         self.assertEqual(call["encoder"], str(self.model_dir / "encoder.int8.onnx"))
         self.assertEqual(call["decoder"], str(self.model_dir / "decoder.int8.onnx"))
         self.assertEqual(call["tokens"], str(self.model_dir / "tokens.txt"))
+        self.assertEqual(call["num_threads"], inference.settings.ASR_MODEL_NUM_THREADS)
 
     def test_load_model_reports_all_missing_required_files(self) -> None:
         """Missing model files should fail before creating the recognizer."""
@@ -4,8 +4,11 @@ from __future__ import annotations
 
 import logging
 import sys
+import tempfile
 import unittest
+from logging.handlers import QueueHandler
 from pathlib import Path
+from types import SimpleNamespace
 
 ROOT_DIR = Path(__file__).resolve().parents[2]
 
@@ -13,7 +16,7 @@ if str(ROOT_DIR) not in sys.path:
     sys.path.insert(0, str(ROOT_DIR))
 
 from core.context import connection_id_ctx, session_id_ctx
-from core.logging import CorrelationIdFilter
+from core.logging import CorrelationIdFilter, setup_logging, stop_logging
 
 
 class LoggingContextTests(unittest.TestCase):
@@ -55,6 +58,52 @@ class LoggingContextTests(unittest.TestCase):
             connection_id_ctx.reset(connection_token)
             session_id_ctx.reset(session_token)
 
+    def test_correlation_filter_keeps_ids_bound_by_logger_adapter(self) -> None:
+        """Records with adapter-bound IDs should not be overwritten from context."""
+        record = self.make_record()
+        record.session_id = "bound-session"
+        record.connection_id = "bound-conn"
+
+        self.assertTrue(CorrelationIdFilter().filter(record))
+
+        self.assertEqual(record.session_id, "bound-session")
+        self.assertEqual(record.connection_id, "bound-conn")
+
+    def test_setup_logging_writes_through_queue_with_correlation_ids(self) -> None:
+        """Root logging should enqueue records and keep the caller's context IDs."""
+        root_logger = logging.getLogger()
+        original_handlers = root_logger.handlers[:]
+        original_level = root_logger.level
+
+        def restore_root_logger() -> None:
+            stop_logging()
+            for handler in root_logger.handlers[:]:
+                root_logger.removeHandler(handler)
+                handler.close()
+            for handler in original_handlers:
+                root_logger.addHandler(handler)
+            root_logger.setLevel(original_level)
+
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.addCleanup(restore_root_logger)
+
+        setup_logging(SimpleNamespace(LOG_LEVEL="INFO", LOG_DIR=temp_dir.name))
+        self.assertEqual(len(root_logger.handlers), 1)
+        self.assertIsInstance(root_logger.handlers[0], QueueHandler)
+
+        session_token = session_id_ctx.set("queued-session")
+        try:
+            logging.getLogger("test").info("queued message")
+        finally:
+            session_id_ctx.reset(session_token)
+        stop_logging()
+
+        log_text = "".join(
+            path.read_text(encoding="utf-8") for path in Path(temp_dir.name).glob("*.log")
+        )
+        self.assertIn("- [queued-session/-] - test - INFO - queued message\n", log_text)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -557,6 +557,18 @@ class ServiceManagerTests(unittest.TestCase):
         self.assertEqual(source_map["linux_journal"].kind, "journal")
         self.assertTrue(source_map["linux_journal"].available)
 
+    def test_list_log_sources_prefers_active_app_log(self) -> None:
+        """The application log source should point at app.log over dated logs."""
+        self.write_metadata(service_manager.WINDOWS_BACKEND, "CustomTask", "uvicorn")
+        (self.logs_dir / "2024-01-01.log").write_text("legacy\n", encoding="utf-8")
+        (self.logs_dir / "app.log").write_text("current\n", encoding="utf-8")
+
+        sources = self.controller.list_log_sources()
+        source_map = {source.source_id: source for source in sources}
+
+        self.assertTrue(source_map["app_log"].available)
+        self.assertEqual(source_map["app_log"].descriptor, str(self.logs_dir / "app.log"))
+
     def test_read_log_source_tails_file_lines(self) -> None:
         """File-backed log reads should return only the requested tail lines."""
         self.write_metadata(service_manager.WINDOWS_BACKEND, "CustomTask", "uvicorn")
@@ -2,9 +2,20 @@
 
 from __future__ import annotations
 
+import asyncio
+import io
 import sys
+import tempfile
 import unittest
+from contextlib import redirect_stdout
 from pathlib import Path
+from types import SimpleNamespace
+
+import librosa
+import numpy as np
+import soundfile as sf
+from websockets.exceptions import ConnectionClosedOK
+from websockets.frames import Close
 
 ROOT_DIR = Path(__file__).resolve().parents[2]
 SCRIPTS_DIR = ROOT_DIR / "scripts"
@@ -13,10 +24,22 @@ for import_path in (ROOT_DIR, SCRIPTS_DIR):
     if str(import_path) not in sys.path:
         sys.path.insert(0, str(import_path))
 
+from scripts import simulate_concurrent_streams
+from scripts._stream_common import convert_to_alaw, float_to_pcm16
 from scripts.simulate_concurrent_streams import (
     StreamStats,
     build_report,
+    alaw_cache_path,
     classify_stream,
+    convert_file_to_alaw,
+    load_audio_data,
+    load_audio_files,
+    print_summary,
+    run_concurrent_streams,
+    run_single_stream,
+    split_audio_chunks,
+    stream_receiver,
+    stream_sender,
 )
 
 
@@ -113,6 +136,371 @@ class ConcurrentStreamReportTests(unittest.TestCase):
         self.assertEqual(report["streams"][1]["close_reason"], "busy")
         self.assertEqual(report["streams"][2]["error"], "Connection error: refused")
 
+    def test_print_summary_totals_successful_streams(self) -> None:
+        """The terminal summary aggregates successful streams and labels each row."""
+        stats_list = [
+            StreamStats(stream_id="ok-1", chunks_sent=5, messages_received=4,
+                        partials_received=3, finals_received=1, start_time=0.0, end_time=2.0),
+            StreamStats(stream_id="ok-2", chunks_sent=7, messages_received=2,
+                        partials_received=1, finals_received=1, start_time=0.0, end_time=4.0),
+            StreamStats(stream_id="busy", overloads_received=1, errors_received=1,
+                        error="Server error: inference_overloaded"),
+        ]
+
+        output = io.StringIO()
+        with redirect_stdout(output):
+            print_summary(stats_list, total_time=4.0)
+        text = output.getvalue()
+
+        self.assertIn("Total Chunks Sent:      12", text)
+        self.assertIn("Total Messages Received: 6", text)
+        self.assertIn("  - Partials:           4", text)
+        self.assertIn("  - Finals:             2", text)
+        self.assertIn("  - Errors:             1", text)
+        self.assertIn("Avg Stream Duration:    3.00s", text)
+        rows = {line.split()[0]: line.split()[-1] for line in text.splitlines()
+                if line.startswith(("ok-", "busy"))}
+        self.assertEqual(rows, {"ok-1": "OK", "ok-2": "OK", "busy": "OVERLOAD"})
+
+
+class ConvertFileToAlawTests(unittest.TestCase):
+    """Test block-wise conversion of PCM files to 8 kHz A-law."""
+
+    def test_blockwise_conversion_matches_whole_file_load(self) -> None:
+        """Small blocks should produce the same bytes as a whole-file load."""
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        path = str(Path(temp_dir.name) / "stereo16k.wav")
+        t = np.arange(16000 * 2) / 16000
+        tone = (0.5 * np.sin(2 * np.pi * 440 * t)).astype(np.float32)
+        sf.write(path, np.stack([tone, tone], axis=1), 16000, subtype="PCM_16")
+
+        y, _ = librosa.load(path, sr=8000)
+        expected = convert_to_alaw(float_to_pcm16(y))
+
+        self.assertEqual(convert_file_to_alaw(path, block_seconds=0.3), expected)
+
+
+class LoadAudioCacheTests(unittest.TestCase):
+    """Test the on-disk cache of converted load-test audio."""
+
+    def setUp(self) -> None:
+        """Create a source file and count PCM conversions."""
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.audio_file = str(Path(temp_dir.name) / "speech.flac")
+        Path(self.audio_file).write_bytes(b"not really flac")
+        self.load_calls = 0
+
+        def fake_load(path: str, sr: int, dtype: type = np.float32) -> tuple[np.ndarray, int]:
+            self.load_calls += 1
+            return np.array([0.0, 0.5, -0.5], dtype=np.float32), sr
+
+        original_librosa = simulate_concurrent_streams.librosa
+        self.addCleanup(setattr, simulate_concurrent_streams, "librosa", original_librosa)
+        simulate_concurrent_streams.librosa = SimpleNamespace(load=fake_load)
+
+    def test_second_load_reads_cached_conversion(self) -> None:
+        """A second load of an unchanged file should skip decoding."""
+        first = load_audio_data(self.audio_file)
+        second = load_audio_data(self.audio_file)
+
+        self.assertEqual(first, second)
+        self.assertEqual(self.load_calls, 1)
+        self.assertEqual(Path(alaw_cache_path(self.audio_file)).read_bytes(), first)
+
+    def test_changed_source_replaces_stale_cache(self) -> None:
+        """Editing the source should reconvert and drop the old sidecar."""
+        load_audio_data(self.audio_file)
+        stale_cache = alaw_cache_path(self.audio_file)
+
+        Path(self.audio_file).write_bytes(b"different, longer contents")
+        load_audio_data(self.audio_file)
+
+        self.assertEqual(self.load_calls, 2)
+        self.assertFalse(Path(stale_cache).exists())
+        self.assertTrue(Path(alaw_cache_path(self.audio_file)).exists())
+
+
+class SlowWebSocket:
+    """WebSocket test double whose sends take a fixed amount of time."""
+
+    def __init__(self, send_delay: float) -> None:
+        """Store the simulated send latency."""
+        self.send_delay = send_delay
+        self.sent: list[bytes] = []
+        self.send_times: list[float] = []
+
+    async def send(self, data: bytes) -> None:
+        """Record a chunk after the simulated latency."""
+        await asyncio.sleep(self.send_delay)
+        self.sent.append(data)
+        self.send_times.append(asyncio.get_running_loop().time())
+
+
+class StreamSenderTests(unittest.TestCase):
+    """Test chunking and pacing in the load-test sender."""
+
+    def test_split_audio_chunks_keeps_short_tail(self) -> None:
+        """Audio is split into chunk-duration slices with a shorter final slice."""
+        chunks = split_audio_chunks(bytes(range(10)), 0.0005)
+
+        self.assertEqual(chunks, [bytes([0, 1, 2, 3]), bytes([4, 5, 6, 7]), bytes([8, 9])])
+
+    def test_send_latency_does_not_slow_the_offered_rate(self) -> None:
+        """Chunks should follow fixed deadlines rather than sleeping after each send."""
+        async def scenario() -> tuple[SlowWebSocket, StreamStats, float]:
+            websocket = SlowWebSocket(send_delay=0.03)
+            stats = StreamStats(stream_id="paced")
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            chunks = split_audio_chunks(b"\x00" * 1600, 0.05)
+            await stream_sender(websocket, chunks, 0.05, stats)
+            return websocket, stats, loop.time() - started
+
+        websocket, stats, elapsed = asyncio.run(scenario())
+
+        self.assertEqual(len(websocket.sent), 4)
+        self.assertEqual(stats.chunks_sent, 4)
+        self.assertIsNone(stats.error)
+        # Sleeping a full chunk after each send would take 4 * 0.08s.
+        self.assertLess(elapsed, 0.28)
+
+    def test_short_chunks_are_sent_in_batches(self) -> None:
+        """Chunks shorter than the minimum interval share one wakeup per batch."""
+        async def scenario() -> tuple[SlowWebSocket, StreamStats]:
+            websocket = SlowWebSocket(send_delay=0.0)
+            stats = StreamStats(stream_id="batched")
+            chunks = split_audio_chunks(b"\x00" * 800, 0.025)
+            await stream_sender(websocket, chunks, 0.025, stats)
+            return websocket, stats
+
+        websocket, stats = asyncio.run(scenario())
+
+        self.assertEqual(stats.chunks_sent, 4)
+        times = websocket.send_times
+        # Two chunks go out back-to-back, then the sender sleeps ~50ms.
+        self.assertLess(times[1] - times[0], 0.02)
+        self.assertGreater(times[2] - times[1], 0.03)
+        self.assertLess(times[3] - times[2], 0.02)
+
+
+class ScriptedReceiveWebSocket:
+    """WebSocket test double that replays server messages, then closes."""
+
+    def __init__(self, messages: list[str]) -> None:
+        """Store the messages to return from ``recv``."""
+        self.messages = list(messages)
+
+    async def recv(self, decode: bool | None = None) -> str | bytes:
+        """Return the next message, as bytes when ``decode`` is false."""
+        if self.messages:
+            message = self.messages.pop(0)
+            return message.encode() if decode is False else message
+        raise ConnectionClosedOK(Close(1000, "done"), None)
+
+
+class StreamReceiverTests(unittest.TestCase):
+    """Test server message accounting in the load-test receiver."""
+
+    def test_receiver_counts_message_types_and_overloads(self) -> None:
+        """Partials, finals, and overload errors are counted per stream."""
+        websocket = ScriptedReceiveWebSocket([
+            '{"type":"partial","text":"he","seq":1}',
+            '{"type":"final","text":"said \\"type\\":\\"partial\\"","seq":1}',
+            '{"type": "partial", "text": "spaced", "seq": 2}',
+            '{"type":"error","code":"inference_overloaded","message":"busy"}',
+        ])
+        stats = StreamStats(stream_id="receiver")
+
+        asyncio.run(stream_receiver(websocket, stats))
+
+        self.assertEqual(stats.messages_received, 4)
+        self.assertEqual(stats.partials_received, 2)
+        self.assertEqual(stats.finals_received, 1)
+        self.assertEqual(stats.errors_received, 1)
+        self.assertEqual(stats.overloads_received, 1)
+        self.assertEqual(stats.error, "Server error: inference_overloaded")
+        self.assertEqual(stats.close_code, 1000)
+        self.assertEqual(stats.close_reason, "done")
+
+    def test_late_final_for_earlier_segment_does_not_end_drain(self) -> None:
+        """Only a final at or past the latest partial's seq sets the event."""
+        def run(messages: list[str]) -> bool:
+            async def scenario() -> bool:
+                final_event = asyncio.Event()
+                stats = StreamStats(stream_id="drain")
+                await stream_receiver(ScriptedReceiveWebSocket(messages), stats, final_event)
+                return final_event.is_set()
+
+            return asyncio.run(scenario())
+
+        opened = [
+            '{"type":"partial","text":"he","seq":1}',
+            '{"type":"partial","text":"wo","seq":2}',
+            '{"type":"final","text":"said \\"seq\\":9","seq":1}',
+        ]
+
+        self.assertFalse(run(opened))
+        self.assertTrue(run(opened + ['{"type":"final","text":"world","seq":2}']))
+
+
+class EchoFinalWebSocket:
+    """WebSocket test double that answers the last chunk with a final result."""
+
+    def __init__(self, expected_chunks: int) -> None:
+        """Store how many chunks complete the utterance."""
+        self.expected_chunks = expected_chunks
+        self.received = 0
+        self.replies: asyncio.Queue[str] = asyncio.Queue()
+
+    async def __aenter__(self) -> "EchoFinalWebSocket":
+        """Enter the connection context."""
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        """Leave the connection context."""
+
+    async def send(self, data: bytes) -> None:
+        """Count chunks and queue a final once all have arrived."""
+        self.received += 1
+        if self.received == self.expected_chunks:
+            self.replies.put_nowait('{"type":"final","text":"done","seq":1}')
+
+    async def recv(self, decode: bool | None = None) -> bytes:
+        """Return the next queued reply as raw bytes."""
+        return (await self.replies.get()).encode()
+
+
+class RunSingleStreamTests(unittest.TestCase):
+    """Test the lifecycle of one simulated stream."""
+
+    def test_stream_ends_when_trailing_final_arrives(self) -> None:
+        """The drain should stop at the final result instead of a fixed sleep."""
+        websocket_holder: list[EchoFinalWebSocket] = []
+
+        async def connect(url: str, **kwargs: object) -> EchoFinalWebSocket:
+            websocket = EchoFinalWebSocket(expected_chunks=2)
+            websocket_holder.append(websocket)
+            return websocket
+
+        original_websockets = simulate_concurrent_streams.websockets
+        self.addCleanup(setattr, simulate_concurrent_streams, "websockets", original_websockets)
+        simulate_concurrent_streams.websockets = SimpleNamespace(
+            connect=connect,
+            exceptions=original_websockets.exceptions,
+        )
+
+        async def scenario() -> tuple[StreamStats, float]:
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            stats = await run_single_stream(
+                "drain",
+                "ws://test/ws/transcribe",
+                split_audio_chunks(b"\x00" * 800, 0.05),
+                0.05,
+                asyncio.Semaphore(1),
+            )
+            return stats, loop.time() - started
+
+        stats, elapsed = asyncio.run(scenario())
+
+        self.assertEqual(stats.chunks_sent, 2)
+        self.assertEqual(stats.finals_received, 1)
+        self.assertIsNone(stats.error)
+        self.assertLess(elapsed, 1.0)
+
+
+class MultiClipTests(unittest.TestCase):
+    """Test loading several clips and spreading them across streams."""
+
+    def test_load_audio_files_preserves_order(self) -> None:
+        """Files converted in the process pool come back in input order."""
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        paths = []
+        for index in range(3):
+            path = Path(temp_dir.name) / f"clip{index}.alaw"
+            path.write_bytes(bytes([index]) * (index + 1))
+            paths.append(str(path))
+
+        self.assertEqual(load_audio_files(paths), [b"\x00", b"\x01\x01", b"\x02\x02\x02"])
+
+    def test_streams_cycle_through_clips(self) -> None:
+        """Stream ``i`` should send clip ``i % len(clips)``."""
+        sent_lengths: list[int] = []
+
+        async def fake_run_single_stream(stream_id: str, host_base: str, chunks: list[memoryview],
+                                         *args: object) -> StreamStats:
+            sent_lengths.append(sum(len(chunk) for chunk in chunks))
+            return StreamStats(stream_id=stream_id)
+
+        original = simulate_concurrent_streams.run_single_stream
+        self.addCleanup(setattr, simulate_concurrent_streams, "run_single_stream", original)
+        simulate_concurrent_streams.run_single_stream = fake_run_single_stream
+
+        asyncio.run(
+            run_concurrent_streams(
+                host_base="ws://test/ws/transcribe",
+                audio_clips=[b"\x00" * 100, b"\x00" * 200],
+                num_streams=5,
+                chunk_duration=0.01,
+                stagger_delay=0.0,
+            )
+        )
+
+        self.assertEqual(sent_lengths, [100, 200, 100, 200, 100])
+
+
+class ConnectConcurrencyTests(unittest.TestCase):
+    """Test bounding of simultaneous connection handshakes."""
+
+    def test_handshakes_are_bounded_by_connect_concurrency(self) -> None:
+        """No more than ``connect_concurrency`` handshakes should run at once."""
+        in_flight = 0
+        peak = 0
+        attempts = 0
+        connect_kwargs: list[dict[str, object]] = []
+
+        async def refusing_connect(url: str, **kwargs: object) -> None:
+            nonlocal in_flight, peak, attempts
+            attempts += 1
+            connect_kwargs.append(kwargs)
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            raise OSError("connection refused")
+
+        original_websockets = simulate_concurrent_streams.websockets
+        self.addCleanup(setattr, simulate_concurrent_streams, "websockets", original_websockets)
+        simulate_concurrent_streams.websockets = SimpleNamespace(
+            connect=refusing_connect,
+            exceptions=original_websockets.exceptions,
+        )
+
+        stats_list, _ = asyncio.run(
+            run_concurrent_streams(
+                host_base="ws://test/ws/transcribe",
+                audio_clips=[b"\x00" * 800, b"\x00" * 1600],
+                num_streams=6,
+                chunk_duration=0.1,
+                stagger_delay=0.0,
+                connect_concurrency=2,
+            )
+        )
+
+        stream_ids = [stats.stream_id for stats in stats_list]
+        self.assertEqual(len(set(stream_ids)), 6)
+        self.assertEqual(len({stream_id.rsplit("-", 1)[1] for stream_id in stream_ids}), 1)
+        self.assertEqual(attempts, 6)
+        self.assertEqual(peak, 2)
+        self.assertTrue(all(kwargs["compression"] is None for kwargs in connect_kwargs))
+        self.assertTrue(all(kwargs["ping_interval"] is None for kwargs in connect_kwargs))
+        self.assertTrue(all(
+            stats.error == "Connection error: connection refused" for stats in stats_list
+        ))
+
 
 if __name__ == "__main__":
     unittest.main()
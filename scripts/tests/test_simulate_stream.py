@@ -0,0 +1,120 @@
+"""Unit tests for the single-stream simulator."""
+
+from __future__ import annotations
+
+import asyncio
+import io
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+
+import librosa
+import numpy as np
+import soundfile as sf
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from scripts._stream_common import convert_to_alaw, float_to_pcm16
+from scripts.simulate_stream import get_audio_generator, send_audio
+
+
+async def collect_chunks(*args: object) -> list[bytes]:
+    """Drain ``get_audio_generator`` into a list of byte strings."""
+    return [bytes(chunk) async for chunk in get_audio_generator(*args)]
+
+
+class RecordingWebSocket:
+    """WebSocket test double that records sent chunks."""
+
+    def __init__(self) -> None:
+        """Initialize captured chunks."""
+        self.sent: list[bytes] = []
+
+    async def send(self, data: bytes) -> None:
+        """Capture a sent chunk."""
+        self.sent.append(bytes(data))
+
+
+class SendAudioTests(unittest.TestCase):
+    """Test streaming a file through ``send_audio``."""
+
+    def setUp(self) -> None:
+        """Create a scratch directory for audio files."""
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.temp_dir = Path(temp_dir.name)
+
+    def test_raw_alaw_file_is_sent_in_order(self) -> None:
+        """Every chunk of a raw A-law file is sent once, in file order."""
+        audio_file = self.temp_dir / "speech.alaw"
+        audio_file.write_bytes(bytes(range(200)) * 2)
+        websocket = RecordingWebSocket()
+
+        with redirect_stdout(io.StringIO()) as output:
+            asyncio.run(send_audio(websocket, str(audio_file), 0.01, "alaw", 8000))
+
+        self.assertEqual(b"".join(websocket.sent), audio_file.read_bytes())
+        self.assertEqual([len(chunk) for chunk in websocket.sent], [80] * 5)
+        self.assertIn("Chunks sent: 5", output.getvalue())
+
+
+class GetAudioGeneratorTests(unittest.TestCase):
+    """Test chunking of converted PCM audio."""
+
+    def test_pcm_wav_is_converted_into_full_chunks(self) -> None:
+        """Converted audio matches a whole-file load, cut into full chunks."""
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        path = str(Path(temp_dir.name) / "tone16k.wav")
+        tone = np.arange(int(16000 * 2.5), dtype=np.float32)
+        tone *= 2 * np.pi * 440 / 16000
+        np.sin(tone, out=tone)
+        tone *= 0.5
+        sf.write(path, tone, 16000, subtype="PCM_16")
+
+        with redirect_stdout(io.StringIO()):
+            chunks = asyncio.run(collect_chunks(path, 0.6, "alaw", 8000))
+
+        y, _ = librosa.load(path, sr=8000, dtype=np.float32)
+        self.assertEqual(b"".join(chunks), convert_to_alaw(float_to_pcm16(y)))
+        self.assertEqual([len(chunk) for chunk in chunks[:-1]], [4800] * (len(chunks) - 1))
+        self.assertLessEqual(len(chunks[-1]), 4800)
+
+    def test_alaw_wav_passes_through_data_chunk_only(self) -> None:
+        """An A-law WAV streams exactly its data chunk, without the header."""
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        path = str(Path(temp_dir.name) / "speech.wav")
+        samples = np.linspace(-0.5, 0.5, 1000, dtype=np.float32)
+        sf.write(path, samples, 8000, subtype="ALAW")
+
+        with redirect_stdout(io.StringIO()):
+            chunks = asyncio.run(collect_chunks(path, 0.05, "alaw", 8000))
+
+        data = Path(path).read_bytes()
+        self.assertEqual(b"".join(chunks), data[-1000:])
+        self.assertEqual([len(chunk) for chunk in chunks], [400, 400, 200])
+
+    def test_pcm16_wav_at_target_rate_passes_through(self) -> None:
+        """A mono PCM16 WAV at the requested rate is sent without re-encoding."""
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        path = str(Path(temp_dir.name) / "speech16k.wav")
+        samples = np.arange(-1000, 1000, dtype=np.int16) * 8
+        sf.write(path, samples, 16000, subtype="PCM_16")
+
+        with redirect_stdout(io.StringIO()) as output:
+            chunks = asyncio.run(collect_chunks(path, 0.05, "pcm16le", 16000))
+
+        self.assertIn("passing through", output.getvalue())
+        self.assertEqual(b"".join(chunks), samples.tobytes())
+        self.assertEqual([len(chunk) for chunk in chunks], [1600, 1600, 800])
+
+
+if __name__ == "__main__":
+    unittest.main()
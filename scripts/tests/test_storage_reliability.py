@@ -9,7 +9,9 @@ from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any
 
-from sqlalchemy import UniqueConstraint
+from sqlalchemy import Insert, UniqueConstraint
+from sqlalchemy.dialects import mysql
+from sqlalchemy.exc import IntegrityError
 
 ROOT_DIR = Path(__file__).resolve().parents[2]
 
@@ -73,7 +75,18 @@ class FakeAsyncSession:
         return self
 
     async def execute(self, statement: Any) -> FakeScalarResult:
-        """Return fake results for session lookup and max-sequence queries."""
+        """Return fake results for session lookup, upsert, and max-sequence queries."""
+        if isinstance(statement, Insert):
+            params = statement.compile(dialect=mysql.dialect()).params
+            if statement.table.name == Segment.__tablename__:
+                self.add(Segment(**params))
+            else:
+                self.database.sessions.setdefault(
+                    params["id"],
+                    Session(id=params["id"], user_id=params["user_id"]),
+                )
+            return FakeScalarResult(None)
+
         statement_text = str(statement)
         if "max(" in statement_text:
             session_id = self._extract_bound_session_id(statement)
@@ -96,7 +109,11 @@ class FakeAsyncSession:
                     existing.session_id == instance.session_id
                     and existing.segment_seq == instance.segment_seq
                 ):
-                    raise RuntimeError("duplicate segment sequence")
+                    raise IntegrityError(
+                        "INSERT INTO segments",
+                        {},
+                        Exception("duplicate segment sequence"),
+                    )
             self.database.segments.append(instance)
             return
 
@@ -111,6 +128,20 @@ class FakeAsyncSession:
         raise AssertionError(f"Could not find session id in statement: {statement}")
 
 
+class RecordingAsyncSession(FakeAsyncSession):
+    """Fake session that records executed statements."""
+
+    def __init__(self, database: FakeDatabase, executed: list[Any]) -> None:
+        """Bind to fake database state and a shared statement log."""
+        super().__init__(database)
+        self.executed = executed
+
+    async def execute(self, statement: Any) -> FakeScalarResult:
+        """Record the statement, then execute it against the fake DB."""
+        self.executed.append(statement)
+        return await super().execute(statement)
+
+
 class StorageReliabilityTests(unittest.TestCase):
     """Test final persistence and sequence allocation behavior."""
 
@@ -118,6 +149,8 @@ class StorageReliabilityTests(unittest.TestCase):
         """Reset storage globals and patch the DB session factory."""
         storage._SEQ_BY_SESSION.clear()
         storage._PARTIAL_BY_SESSION.clear()
+        storage._ENSURED_SESSIONS.clear()
+        self.patch_attr(storage, "_next_partial_sweep_at", 0.0)
         self.database = FakeDatabase()
         self.patch_attr(
             storage,
@@ -196,6 +229,48 @@ class StorageReliabilityTests(unittest.TestCase):
 
         asyncio.run(scenario())
 
+    def test_workers_with_separate_caches_do_not_lose_finals(self) -> None:
+        """Two workers sharing a session keep every final and distinct seqs."""
+        first_cache: dict[str, int] = {}
+        second_cache: dict[str, int] = {}
+
+        async def on_worker(cache: dict[str, int], action: Any) -> Any:
+            self.patch_attr(storage, "_SEQ_BY_SESSION", cache)
+            return await action()
+
+        async def scenario() -> None:
+            first = storage.StorageManager("shared-session")
+            second = storage.StorageManager("shared-session")
+
+            # Both connect before either has saved anything.
+            self.assertEqual(await on_worker(first_cache, first.get_current_sequence), 0)
+            self.assertEqual(await on_worker(second_cache, second.get_current_sequence), 0)
+
+            first_seq = await on_worker(first_cache, first.get_next_sequence)
+            second_seq = await on_worker(second_cache, second.get_next_sequence)
+            self.assertEqual(first_seq, second_seq)
+
+            saved_first = await on_worker(
+                first_cache, lambda: first.save_final("first", seq=first_seq)
+            )
+            saved_second = await on_worker(
+                second_cache, lambda: second.save_final("second", seq=second_seq)
+            )
+
+            self.assertEqual(saved_first.segment_seq, 1)
+            self.assertEqual(saved_second.segment_seq, 2)
+            self.assertEqual(second_cache["shared-session"], 2)
+
+            # A stale worker reseeds past the other worker's finals on connect.
+            self.assertEqual(await on_worker(first_cache, first.get_current_sequence), 2)
+
+        asyncio.run(scenario())
+
+        self.assertEqual(
+            [(segment.segment_seq, segment.content) for segment in self.database.segments],
+            [(1, "first"), (2, "second")],
+        )
+
     def test_same_session_sequential_saves_do_not_duplicate_sequence(self) -> None:
         """Sequential final saves for one session should persist distinct seq values."""
         async def scenario() -> None:
@@ -212,6 +287,210 @@ class StorageReliabilityTests(unittest.TestCase):
 
         asyncio.run(scenario())
 
+    def test_final_save_creates_session_in_single_transaction(self) -> None:
+        """A final save for a new session should use one DB session end to end."""
+        opened_sessions: list[FakeAsyncSession] = []
+
+        def session_factory() -> FakeAsyncSession:
+            db_session = FakeAsyncSession(self.database)
+            opened_sessions.append(db_session)
+            return db_session
+
+        self.patch_attr(storage, "AsyncSessionLocal", session_factory)
+
+        async def scenario() -> None:
+            segment = await storage.StorageManager("single-tx-session").save_final(
+                "text",
+                user_id="websocket_client",
+            )
+
+            self.assertEqual(segment.segment_seq, 1)
+            self.assertEqual(
+                self.database.sessions["single-tx-session"].user_id,
+                "websocket_client",
+            )
+            self.assertEqual(len(opened_sessions), 1)
+
+        asyncio.run(scenario())
+
+    def test_ensure_session_exists_upserts_without_overwriting(self) -> None:
+        """Ensuring a session should insert it once and keep the original row."""
+        async def scenario() -> None:
+            await storage.StorageManager("upsert-session").ensure_session_exists("first")
+            await storage.StorageManager("upsert-session").ensure_session_exists("second")
+
+        asyncio.run(scenario())
+
+        self.assertEqual(self.database.sessions["upsert-session"].user_id, "first")
+
+    def test_ensure_session_statement_is_mysql_upsert(self) -> None:
+        """The ensure statement should compile to a single MySQL upsert."""
+        executed: list[Any] = []
+        self.patch_attr(
+            storage,
+            "AsyncSessionLocal",
+            lambda: RecordingAsyncSession(self.database, executed),
+        )
+
+        asyncio.run(storage.StorageManager("sql-session").ensure_session_exists())
+
+        self.assertEqual(len(executed), 1)
+        sql = str(executed[0].compile(dialect=mysql.dialect()))
+        self.assertIn("INSERT INTO sessions", sql)
+        self.assertIn("ON DUPLICATE KEY UPDATE", sql)
+
+    def test_final_save_upserts_session_before_locking_it(self) -> None:
+        """The session row is upserted, then locked by primary key only."""
+        executed: list[Any] = []
+        self.patch_attr(
+            storage,
+            "AsyncSessionLocal",
+            lambda: RecordingAsyncSession(self.database, executed),
+        )
+
+        asyncio.run(storage.StorageManager("lock-session").save_final("text"))
+
+        upsert_sql = str(executed[0].compile(dialect=mysql.dialect()))
+        self.assertIn("ON DUPLICATE KEY UPDATE", upsert_sql)
+        lock_statement = executed[1]
+        self.assertEqual(list(lock_statement.selected_columns.keys()), ["id"])
+        self.assertIn("FOR UPDATE", str(lock_statement.compile(dialect=mysql.dialect())))
+
+    def test_ensured_session_with_reserved_sequence_skips_session_statements(self) -> None:
+        """An ensured session's reserved final should only insert the segment."""
+        executed: list[Any] = []
+        self.patch_attr(
+            storage,
+            "AsyncSessionLocal",
+            lambda: RecordingAsyncSession(self.database, executed),
+        )
+
+        async def scenario() -> None:
+            manager = storage.StorageManager("ensured-session")
+            await manager.ensure_session_exists()
+            executed.clear()
+
+            await manager.save_final("text", seq=await manager.get_next_sequence())
+
+        asyncio.run(scenario())
+
+        self.assertEqual(len(executed), 1)
+        self.assertIsInstance(executed[0], Insert)
+        self.assertEqual(executed[0].table.name, Segment.__tablename__)
+
+    def test_final_save_with_reserved_sequence_keeps_later_draft(self) -> None:
+        """A reserved final inserts its seq and keeps a newer draft cached."""
+        async def scenario() -> None:
+            manager = storage.StorageManager("reserved-session")
+            seq = await manager.get_next_sequence()
+            await manager.save_partial("next draft", seq + 1)
+
+            segment = await manager.save_final("text", seq=seq)
+
+            self.assertEqual(segment.segment_seq, 1)
+            self.assertEqual(
+                [saved.segment_seq for saved in self.database.segments],
+                [1],
+            )
+            self.assertEqual(storage._PARTIAL_BY_SESSION["reserved-session"].seq, 2)
+            self.assertEqual(storage._SEQ_BY_SESSION["reserved-session"], 1)
+
+        asyncio.run(scenario())
+
+    def test_ensured_session_skips_database(self) -> None:
+        """A session ensured once should not be upserted again by this process."""
+        opened_sessions: list[FakeAsyncSession] = []
+
+        def session_factory() -> FakeAsyncSession:
+            db_session = FakeAsyncSession(self.database)
+            opened_sessions.append(db_session)
+            return db_session
+
+        self.patch_attr(storage, "AsyncSessionLocal", session_factory)
+
+        async def scenario() -> None:
+            manager = storage.StorageManager("cached-session")
+            await manager.ensure_session_exists()
+            await manager.ensure_session_exists()
+            await storage.StorageManager("cached-session").ensure_session_exists()
+
+        asyncio.run(scenario())
+
+        self.assertEqual(len(opened_sessions), 1)
+
+    def test_ensured_session_cache_is_bounded(self) -> None:
+        """The ensured-session cache should evict its oldest entries."""
+        self.patch_attr(storage, "_ENSURED_SESSIONS_MAX", 2)
+
+        for session_id in ("a", "b", "c"):
+            storage._mark_session_ensured(session_id)
+
+        self.assertEqual(list(storage._ENSURED_SESSIONS), ["b", "c"])
+
+    def test_concurrent_sequence_increments_are_distinct(self) -> None:
+        """Concurrent in-memory increments should never hand out the same value."""
+        async def scenario() -> list[int]:
+            manager = storage.StorageManager("incr-session")
+            return await asyncio.gather(*(manager.get_next_sequence() for _ in range(5)))
+
+        self.assertEqual(sorted(asyncio.run(scenario())), [1, 2, 3, 4, 5])
+        self.assertEqual(storage._SEQ_BY_SESSION["incr-session"], 5)
+
+    def test_partial_save_replaces_draft(self) -> None:
+        """Each partial should overwrite the session's cached draft."""
+        async def scenario() -> None:
+            manager = storage.StorageManager("draft-session")
+            await manager.save_partial("he", 1)
+            await manager.save_partial("hello", 1)
+
+        asyncio.run(scenario())
+
+        entry = storage._PARTIAL_BY_SESSION["draft-session"]
+        self.assertEqual((entry.content, entry.seq), ("hello", 1))
+
+    def test_expired_partials_are_swept_at_most_once_per_interval(self) -> None:
+        """Partial saves should only scan for expired entries once per interval."""
+        storage._PARTIAL_BY_SESSION["stale-session"] = storage.PartialEntry(
+            content="old",
+            seq=1,
+            ts=0.0,
+            expires_at=0.0,
+        )
+
+        storage._cleanup_expired_partials(100.0)
+        self.assertNotIn("stale-session", storage._PARTIAL_BY_SESSION)
+
+        storage._PARTIAL_BY_SESSION["stale-session"] = storage.PartialEntry(
+            content="old",
+            seq=1,
+            ts=0.0,
+            expires_at=0.0,
+        )
+        storage._cleanup_expired_partials(101.0)
+        self.assertIn("stale-session", storage._PARTIAL_BY_SESSION)
+
+        storage._cleanup_expired_partials(100.0 + storage._PARTIAL_SWEEP_INTERVAL_SECONDS)
+        self.assertNotIn("stale-session", storage._PARTIAL_BY_SESSION)
+
+    def test_engine_pool_uses_configured_limits(self) -> None:
+        """The shared engine should size its pool from settings."""
+        pool = storage.engine.pool
+
+        self.assertEqual(pool.size(), storage.settings.MYSQL_POOL_SIZE)
+        self.assertEqual(pool._max_overflow, storage.settings.MYSQL_MAX_OVERFLOW)
+        self.assertEqual(pool._timeout, storage.settings.MYSQL_POOL_TIMEOUT_SECONDS)
+        self.assertEqual(pool._recycle, storage.settings.MYSQL_POOL_RECYCLE_SECONDS)
+
+    def test_timestamps_are_computed_in_sql(self) -> None:
+        """Inserts should stamp ``created_at`` with UTC_TIMESTAMP() in MySQL."""
+        sql = str(
+            storage.insert(Segment)
+            .values(id="s", session_id="x", segment_seq=1, content="t")
+            .compile(dialect=mysql.dialect())
+        )
+
+        self.assertIn("utc_timestamp()", sql.lower())
+
     def test_segments_has_unique_session_sequence_constraint(self) -> None:
         """Segments should reject duplicate sequence numbers per session at DB level."""
         constraints = [
@@ -229,6 +508,15 @@ class StorageReliabilityTests(unittest.TestCase):
             )
         )
 
+    def test_segments_session_sequence_is_indexed_once(self) -> None:
+        """Inserts should not maintain a duplicate (session_id, segment_seq) index."""
+        indexed_columns = [
+            tuple(column.name for column in index.columns)
+            for index in Segment.__table__.indexes
+        ]
+
+        self.assertNotIn(("session_id", "segment_seq"), indexed_columns)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,198 @@
+"""Unit tests for the stream simulators' shared audio helpers."""
+
+from __future__ import annotations
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+import g711
+import librosa
+import numpy as np
+import soundfile as sf
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from scripts._stream_common import (
+    convert_to_alaw,
+    convert_to_ulaw,
+    float_to_pcm16,
+    iter_pcm16_blocks,
+    parse_wav_header,
+)
+
+
+class G711ConversionTests(unittest.TestCase):
+    """Test PCM to G.711 conversion used by the simulators."""
+
+    def test_convert_to_alaw_matches_g711_encoder(self) -> None:
+        """The lookup table should reproduce g711's encoding for every sample."""
+        pcm = np.arange(-32768, 32768, dtype=np.int16)
+
+        expected = g711.encode_alaw(pcm.astype(np.float32) / 32768.0)
+
+        self.assertEqual(convert_to_alaw(pcm), expected)
+
+    def test_convert_to_alaw_round_trips_through_decoder(self) -> None:
+        """Encoded speech-range samples should decode close to the input."""
+        pcm = np.array([0, 1000, -1000, 16000, -16000], dtype=np.int16)
+
+        decoded = np.asarray(g711.decode_alaw(convert_to_alaw(pcm))) * 32768.0
+
+        np.testing.assert_allclose(decoded, pcm, rtol=0.07, atol=16)
+
+    def test_convert_to_ulaw_matches_g711_encoder(self) -> None:
+        """The mu-law table should reproduce g711's encoding for every sample."""
+        pcm = np.arange(-32768, 32768, dtype=np.int16)
+
+        expected = g711.encode_ulaw(pcm.astype(np.float32) / 32768.0)
+
+        self.assertEqual(convert_to_ulaw(pcm), expected)
+
+
+class FloatToPcm16Tests(unittest.TestCase):
+    """Test float to int16 quantization."""
+
+    def test_rounds_and_saturates_out_of_range_samples(self) -> None:
+        """Clipped input saturates to the int16 limits instead of wrapping."""
+        samples = np.array([0.0, 0.5, -0.5, 1.0, 1.5, -1.5], dtype=np.float32)
+
+        pcm = float_to_pcm16(samples)
+
+        self.assertEqual(pcm.dtype, np.int16)
+        self.assertEqual(pcm.tolist(), [0, 16384, -16384, 32767, 32767, -32768])
+
+
+class IterPcm16BlocksTests(unittest.TestCase):
+    """Test block-wise decoding and resampling of PCM files."""
+
+    def setUp(self) -> None:
+        """Write a two-second 16 kHz stereo tone."""
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.path = str(Path(temp_dir.name) / "stereo16k.wav")
+        t = np.arange(16000 * 2) / 16000
+        tone = (0.5 * np.sin(2 * np.pi * 440 * t)).astype(np.float32)
+        sf.write(self.path, np.stack([tone, tone], axis=1), 16000, subtype="PCM_16")
+
+    def test_blocks_match_whole_file_librosa_load(self) -> None:
+        """Joined blocks equal a whole-file load resampled to the target rate."""
+        y, _ = librosa.load(self.path, sr=8000, dtype=np.float32)
+
+        blocks = list(iter_pcm16_blocks(self.path, 8000, block_seconds=0.3))
+
+        self.assertGreater(len(blocks), 1)
+        np.testing.assert_array_equal(np.concatenate(blocks), float_to_pcm16(y))
+
+    def test_matching_rate_skips_resampling(self) -> None:
+        """Files already at the target rate are only downmixed and quantized."""
+        samples = np.concatenate(list(iter_pcm16_blocks(self.path, 16000, block_seconds=0.5)))
+
+        expected = sf.read(self.path, dtype="int16")[0][:, 0]
+        np.testing.assert_allclose(samples, expected, atol=1)
+
+    def test_mono_pcm16_at_target_rate_is_read_exactly(self) -> None:
+        """Mono 16-bit PCM at the target rate comes back sample for sample."""
+        path = str(Path(self.path).with_name("mono8k.wav"))
+        expected = np.arange(-4000, 4000, dtype=np.int16) * 4
+        sf.write(path, expected, 8000, subtype="PCM_16")
+
+        blocks = list(iter_pcm16_blocks(path, 8000, block_seconds=0.3))
+
+        self.assertEqual(len(blocks), 4)
+        self.assertTrue(all(block.dtype == np.int16 for block in blocks))
+        np.testing.assert_array_equal(np.concatenate(blocks), expected)
+
+
+def build_wav(fmt_chunk: bytes, data: bytes, extra_chunk: bytes = b"") -> bytes:
+    """Assemble a RIFF/WAVE file from a fmt payload and data bytes."""
+    body = (
+        b"WAVE"
+        + b"fmt " + len(fmt_chunk).to_bytes(4, "little") + fmt_chunk
+        + extra_chunk
+        + b"data" + len(data).to_bytes(4, "little") + data
+    )
+    return b"RIFF" + len(body).to_bytes(4, "little") + body
+
+
+def fmt_payload(audio_format: int, sample_rate: int, bits_per_sample: int, extension: bytes = b"") -> bytes:
+    """Build a mono fmt chunk payload with an optional extension."""
+    block_align = bits_per_sample // 8
+    payload = (
+        audio_format.to_bytes(2, "little")
+        + (1).to_bytes(2, "little")
+        + sample_rate.to_bytes(4, "little")
+        + (sample_rate * block_align).to_bytes(4, "little")
+        + block_align.to_bytes(2, "little")
+        + bits_per_sample.to_bytes(2, "little")
+    )
+    if extension:
+        payload += len(extension).to_bytes(2, "little") + extension
+    return payload
+
+
+class ParseWavHeaderTests(unittest.TestCase):
+    """Test WAV header parsing for pass-through detection."""
+
+    def setUp(self) -> None:
+        """Create a scratch directory for WAV files."""
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.temp_dir = Path(temp_dir.name)
+
+    def write(self, name: str, contents: bytes) -> str:
+        """Write a WAV file and return its path."""
+        path = self.temp_dir / name
+        path.write_bytes(contents)
+        return str(path)
+
+    def test_detects_alaw_with_extended_fmt_and_extra_chunk(self) -> None:
+        """Extended fmt chunks and unknown chunks are skipped before data."""
+        list_chunk = b"LIST" + (4).to_bytes(4, "little") + b"INFO"
+        wav = build_wav(fmt_payload(6, 8000, 8, extension=b"\x00\x00"), b"\xd5" * 10, list_chunk)
+        path = self.write("alaw.wav", wav)
+
+        self.assertEqual(parse_wav_header(path), ("alaw", 8000, len(wav) - 10, 10))
+
+    def test_skips_pad_byte_after_odd_sized_chunk(self) -> None:
+        """An odd-sized chunk is followed by a pad byte before the next chunk."""
+        list_chunk = b"LIST" + (5).to_bytes(4, "little") + b"INFOx" + b"\x00"
+        wav = build_wav(fmt_payload(6, 8000, 8), b"\xd5" * 10, list_chunk)
+        path = self.write("odd.wav", wav)
+
+        self.assertEqual(parse_wav_header(path), ("alaw", 8000, len(wav) - 10, 10))
+
+    def test_detects_pcm16_wav(self) -> None:
+        """Mono 16-bit PCM WAVs report their format, rate, and data location."""
+        wav = build_wav(fmt_payload(1, 8000, 16), b"\x00" * 8)
+        path = self.write("pcm.wav", wav)
+
+        self.assertEqual(parse_wav_header(path), ("pcm16le", 8000, len(wav) - 8, 8))
+
+    def test_non_riff_file_is_rejected(self) -> None:
+        """Files without a RIFF/WAVE header are not parsed."""
+        path = self.write("raw.wav", b"\x00" * 64)
+
+        self.assertEqual(parse_wav_header(path), ("", 0, 0, 0))
+
+    def test_unsupported_encoding_is_rejected(self) -> None:
+        """IEEE float WAVs are not a supported passthrough format."""
+        path = self.write("float.wav", build_wav(fmt_payload(3, 8000, 32), b"\x00" * 8))
+
+        self.assertEqual(parse_wav_header(path), ("", 0, 0, 0))
+
+    def test_empty_and_truncated_files_are_rejected(self) -> None:
+        """Files too short for a RIFF header or fmt fields are not parsed."""
+        empty = self.write("empty.wav", b"")
+        truncated = self.write("truncated.wav", build_wav(fmt_payload(6, 8000, 8), b"")[:30])
+
+        self.assertEqual(parse_wav_header(empty), ("", 0, 0, 0))
+        self.assertEqual(parse_wav_header(truncated), ("", 0, 0, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+"""Unit tests for outbound WebSocket event delivery."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import sys
+import unittest
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from api import endpoints
+
+
+class RecordingWebSocket:
+    """WebSocket test double that records sent events."""
+
+    def __init__(self, fail: bool = False) -> None:
+        """Initialize captured messages."""
+        self.messages: list[dict[str, object]] = []
+        self.fail = fail
+
+    async def send_text(self, data: str) -> None:
+        """Capture sent JSON text, optionally failing."""
+        if self.fail:
+            raise RuntimeError("socket closed")
+        self.messages.append(json.loads(data))
+
+
+class OutboundEventPumpTests(unittest.TestCase):
+    """Test queued outbound event delivery."""
+
+    def test_coalesce_keeps_latest_partial_per_sequence(self) -> None:
+        """Queued partials for one sequence collapse to the newest hypothesis."""
+        events = [
+            {"type": "partial", "text": "he", "seq": 1},
+            {"type": "partial", "text": "hello", "seq": 1},
+            {"type": "final", "text": "hello", "seq": 1},
+            {"type": "partial", "text": "wo", "seq": 2},
+        ]
+
+        self.assertEqual(
+            endpoints._coalesce_partials(events),
+            [
+                {"type": "partial", "text": "hello", "seq": 1},
+                {"type": "final", "text": "hello", "seq": 1},
+                {"type": "partial", "text": "wo", "seq": 2},
+            ],
+        )
+
+    def test_close_flushes_queued_events_in_order(self) -> None:
+        """Closing the pump sends everything still queued before returning."""
+        async def scenario() -> RecordingWebSocket:
+            websocket = RecordingWebSocket()
+            pump = endpoints.OutboundEventPump(websocket)
+            pump.put({"type": "partial", "text": "a", "seq": 1})
+            pump.put({"type": "final", "text": "ab", "seq": 1})
+            await pump.close()
+            return websocket
+
+        websocket = asyncio.run(scenario())
+
+        self.assertEqual(
+            [message["type"] for message in websocket.messages],
+            ["partial", "final"],
+        )
+
+    def test_put_surfaces_send_failure(self) -> None:
+        """A failed send should surface on the next enqueue."""
+        async def scenario() -> None:
+            pump = endpoints.OutboundEventPump(RecordingWebSocket(fail=True))
+            pump.put({"type": "final", "text": "a", "seq": 1})
+            await asyncio.sleep(0)
+
+            with self.assertRaises(RuntimeError):
+                pump.put({"type": "final", "text": "b", "seq": 2})
+            await pump.abort()
+
+        asyncio.run(scenario())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,391 @@
+"""Unit tests for the WebSocket receive/inference pipeline."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import sys
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+from fastapi import WebSocketDisconnect
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from api import endpoints
+from core.metrics import RuntimeMetrics
+from services import inference
+
+
+class ScriptedRecognizer:
+    """Sherpa recognizer test double returning one scripted result per chunk."""
+
+    def __init__(self, results: list[tuple[str, bool]]) -> None:
+        """Store the results returned for successive chunks."""
+        self.results = list(results)
+        self.current: tuple[str, bool] = ("", False)
+
+    def create_stream(self) -> object:
+        """Return a stream that records nothing."""
+        return SimpleNamespace(accept_waveform=self.accept_waveform)
+
+    def accept_waveform(self, sample_rate: int, samples: np.ndarray) -> None:
+        """Advance to the next scripted result."""
+        self.current = self.results.pop(0)
+
+    def is_ready(self, stream: object) -> bool:
+        """Report no pending decode work."""
+        return False
+
+    def get_result(self, stream: object) -> str:
+        """Return the current scripted text."""
+        return self.current[0]
+
+    def is_endpoint(self, stream: object) -> bool:
+        """Return whether the current scripted result is final."""
+        return self.current[1]
+
+    def reset(self, stream: object) -> None:
+        """Accept endpoint resets."""
+
+
+class FailingRecognizer(ScriptedRecognizer):
+    """Recognizer double whose second chunk fails after a short decode."""
+
+    def accept_waveform(self, sample_rate: int, samples: np.ndarray) -> None:
+        """Advance, then fail on the second chunk."""
+        super().accept_waveform(sample_rate, samples)
+        if len(self.results) == 2:
+            time.sleep(0.02)
+            raise RuntimeError("simulated decode failure")
+
+
+class FakeStorage:
+    """StorageManager test double that records saves."""
+
+    partials: list[tuple[str, int]] = []
+    finals: list[str] = []
+
+    def __init__(self, session_id: str) -> None:
+        """Bind to a session id."""
+        self.session_id = session_id
+        self.seq = 0
+
+    async def ensure_session_exists(self, user_id: str = "anonymous") -> None:
+        """Pretend the session row exists."""
+
+    async def get_current_sequence(self) -> int:
+        """Start every test session from zero."""
+        return self.seq
+
+    async def get_next_sequence(self) -> int:
+        """Reserve the next sequence number."""
+        self.seq += 1
+        return self.seq
+
+    async def save_partial(self, text: str, seq: int) -> None:
+        """Record a partial save."""
+        self.partials.append((text, seq))
+
+    async def save_final(
+        self,
+        text: str,
+        user_id: str = "anonymous",
+        seq: int | None = None,
+    ) -> SimpleNamespace:
+        """Record a final save and return its sequence."""
+        self.finals.append(text)
+        if seq is None:
+            seq = self.seq = self.seq + 1
+        return SimpleNamespace(segment_seq=seq, content=text)
+
+
+class GatedFinalStorage(FakeStorage):
+    """Storage double whose final save waits for the next partial."""
+
+    partial_saved: asyncio.Event
+
+    async def save_partial(self, text: str, seq: int) -> None:
+        """Record a partial save and release any waiting final."""
+        await super().save_partial(text, seq)
+        self.partial_saved.set()
+
+    async def save_final(
+        self,
+        text: str,
+        user_id: str = "anonymous",
+        seq: int | None = None,
+    ) -> SimpleNamespace:
+        """Block until a later partial has been saved, then record the final."""
+        await asyncio.wait_for(self.partial_saved.wait(), timeout=1.0)
+        return await super().save_final(text, user_id, seq)
+
+
+class FailingFinalStorage(FakeStorage):
+    """Storage double whose final saves always fail."""
+
+    async def save_final(
+        self,
+        text: str,
+        user_id: str = "anonymous",
+        seq: int | None = None,
+    ) -> SimpleNamespace:
+        """Fail the final save."""
+        raise RuntimeError("simulated final save failure")
+
+
+class ContendedFinalStorage(FakeStorage):
+    """Storage double where another worker already stored each reserved seq."""
+
+    async def save_final(
+        self,
+        text: str,
+        user_id: str = "anonymous",
+        seq: int | None = None,
+    ) -> SimpleNamespace:
+        """Store the final under the sequence after the reserved one."""
+        if seq is not None:
+            self.seq = max(self.seq, seq + 1)
+            seq = self.seq
+        return await super().save_final(text, user_id, seq)
+
+
+class SlowDebugAudioWriter:
+    """Debug-audio writer double whose appends take a while."""
+
+    def __init__(self) -> None:
+        """Initialize append and close bookkeeping."""
+        self.started = 0
+        self.appended = 0
+        self.appended_at_close: int | None = None
+
+    def append(
+        self,
+        writer: SlowDebugAudioWriter | None,
+        session_id: str,
+        samples: np.ndarray,
+    ) -> SlowDebugAudioWriter:
+        """Stand in for append_debug_audio_samples with a slow write."""
+        self.started += 1
+        time.sleep(0.05)
+        self.appended += 1
+        return self
+
+    def close(self, writer: SlowDebugAudioWriter | None) -> None:
+        """Stand in for close_debug_audio_writer, recording finished writes."""
+        if writer is not None:
+            self.appended_at_close = self.appended
+
+
+class ScriptedWebSocket:
+    """WebSocket test double that replays chunks, then disconnects."""
+
+    def __init__(self, chunks: list[bytes], expected_messages: int, state: SimpleNamespace) -> None:
+        """Store chunks and the number of sends to wait for before disconnecting."""
+        self.app = SimpleNamespace(state=state)
+        self.chunks = list(chunks)
+        self.expected_messages = expected_messages
+        self.messages: list[dict[str, object]] = []
+        self.all_sent = asyncio.Event()
+
+    async def accept(self) -> None:
+        """Accept the connection."""
+
+    async def receive_bytes(self) -> bytes:
+        """Return the next chunk, or disconnect once all replies were sent."""
+        if self.chunks:
+            return self.chunks.pop(0)
+        await asyncio.wait_for(self.all_sent.wait(), timeout=2.0)
+        raise WebSocketDisconnect(code=1000)
+
+    async def send_text(self, data: str) -> None:
+        """Capture sent JSON events."""
+        self.messages.append(json.loads(data))
+        if len(self.messages) >= self.expected_messages:
+            self.all_sent.set()
+
+
+class FailingSendWebSocket(ScriptedWebSocket):
+    """Scripted WebSocket whose outbound sends fail."""
+
+    async def send_text(self, data: str) -> None:
+        """Fail every send."""
+        raise RuntimeError("socket closed")
+
+
+class WebSocketPipelineTests(unittest.TestCase):
+    """Test the endpoint's producer/consumer audio pipeline."""
+
+    def setUp(self) -> None:
+        """Patch storage and reset recorded saves."""
+        FakeStorage.partials = []
+        FakeStorage.finals = []
+        original_storage = endpoints.StorageManager
+        self.addCleanup(setattr, endpoints, "StorageManager", original_storage)
+        endpoints.StorageManager = FakeStorage
+
+    def run_pipeline(
+        self,
+        results: list[tuple[str, bool]],
+        expected_messages: int,
+        websocket_class: type[ScriptedWebSocket] = ScriptedWebSocket,
+        recognizer_class: type[ScriptedRecognizer] = ScriptedRecognizer,
+    ) -> tuple[ScriptedWebSocket, RuntimeMetrics]:
+        """Stream one chunk per scripted result through the endpoint."""
+        async def scenario() -> tuple[ScriptedWebSocket, RuntimeMetrics]:
+            inference_executor = inference.BoundedInferenceExecutor(
+                max_workers=1,
+                queue_size=1,
+                queue_timeout_seconds=1.0,
+            )
+            audio_executor = ThreadPoolExecutor(max_workers=1)
+            metrics = RuntimeMetrics()
+            model = recognizer_class(results)
+            state = SimpleNamespace(
+                runtime_metrics=metrics,
+                audio_processor=SimpleNamespace(
+                    process=lambda data, state: np.zeros(len(data), dtype=np.float32)
+                ),
+                audio_executor=audio_executor,
+                inference_executor=inference_executor,
+                model=model,
+                stream_decoder=inference.StreamBatchDecoder(model),
+            )
+            websocket = websocket_class(
+                [b"\x00" * 4] * len(results),
+                expected_messages=expected_messages,
+                state=state,
+            )
+            try:
+                await endpoints.websocket_endpoint(websocket, "pipeline-session")
+            finally:
+                inference_executor.shutdown()
+                audio_executor.shutdown()
+            return websocket, metrics
+
+        return asyncio.run(scenario())
+
+    def test_chunks_flow_through_pipeline_in_order(self) -> None:
+        """Received chunks should be transcribed, saved, and answered in order."""
+        websocket, metrics = self.run_pipeline(
+            [("he", False), ("hello", True), ("", False)],
+            expected_messages=2,
+        )
+        self.assertEqual(
+            websocket.messages,
+            [
+                {"type": "partial", "text": "he", "seq": 1},
+                {"type": "final", "text": "hello", "seq": 1},
+            ],
+        )
+        self.assertEqual(FakeStorage.partials, [("he", 1)])
+        self.assertEqual(FakeStorage.finals, ["hello"])
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot["websocket"]["chunks_received"], 3)
+        self.assertEqual(snapshot["transcription"]["empty_results"], 1)
+        self.assertEqual(snapshot["connections"]["disconnected"], 1)
+        self.assertEqual(snapshot["connections"]["errors"], 0)
+        self.assertEqual(snapshot["connections"]["active"], 0)
+
+    def test_final_save_does_not_block_next_partial(self) -> None:
+        """Transcription continues while a final is persisted, in send order."""
+        endpoints.StorageManager = GatedFinalStorage
+        GatedFinalStorage.partial_saved = asyncio.Event()
+
+        websocket, metrics = self.run_pipeline(
+            [("hello", True), ("wo", False)],
+            expected_messages=2,
+        )
+
+        self.assertEqual(
+            websocket.messages,
+            [
+                {"type": "final", "text": "hello", "seq": 1},
+                {"type": "partial", "text": "wo", "seq": 2},
+            ],
+        )
+        self.assertEqual(FakeStorage.partials, [("wo", 2)])
+        # The trailing partial is auto-finalized once the client disconnects.
+        self.assertEqual(FakeStorage.finals, ["hello", "wo"])
+        self.assertEqual(metrics.snapshot()["connections"]["errors"], 0)
+
+    def test_moved_final_sequence_is_reannounced(self) -> None:
+        """A final stored under another seq is re-sent, and partials follow it."""
+        endpoints.StorageManager = ContendedFinalStorage
+
+        websocket, metrics = self.run_pipeline(
+            [("hello", True), ("", False), ("wo", False)],
+            expected_messages=3,
+        )
+
+        self.assertEqual(
+            websocket.messages,
+            [
+                {"type": "final", "text": "hello", "seq": 1},
+                {"type": "final", "text": "hello", "seq": 2},
+                {"type": "partial", "text": "wo", "seq": 3},
+            ],
+        )
+        self.assertEqual(metrics.snapshot()["connections"]["errors"], 0)
+
+    def test_failed_final_save_is_reported_as_storage_error(self) -> None:
+        """A failed background save closes the connection as a storage error."""
+        endpoints.StorageManager = FailingFinalStorage
+
+        websocket, metrics = self.run_pipeline(
+            [("hello", True), ("", False)],
+            expected_messages=1,
+        )
+
+        self.assertEqual(
+            websocket.messages,
+            [{"type": "final", "text": "hello", "seq": 1}],
+        )
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot["storage"]["save_errors"], 1)
+        self.assertEqual(snapshot["connections"]["errors"], 1)
+
+    def test_debug_audio_write_in_flight_finishes_before_close(self) -> None:
+        """Closing the connection waits for a cancelled receiver's debug write."""
+        writer = SlowDebugAudioWriter()
+        for name, value in (
+            ("is_debug_audio_enabled", lambda: True),
+            ("append_debug_audio_samples", writer.append),
+            ("close_debug_audio_writer", writer.close),
+        ):
+            self.addCleanup(setattr, endpoints, name, getattr(endpoints, name))
+            setattr(endpoints, name, value)
+
+        self.run_pipeline(
+            [("", False)] * 4,
+            expected_messages=0,
+            recognizer_class=FailingRecognizer,
+        )
+
+        self.assertGreater(writer.started, 0)
+        self.assertEqual(writer.appended_at_close, writer.started)
+
+    def test_send_failure_is_not_reported_as_storage_error(self) -> None:
+        """A dead outbound pump must not be counted against a committed final."""
+        websocket, metrics = self.run_pipeline(
+            [("hello", True), ("wo", False)],
+            expected_messages=1,
+            websocket_class=FailingSendWebSocket,
+        )
+
+        self.assertEqual(FakeStorage.finals[0], "hello")
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot["storage"]["save_errors"], 0)
+        self.assertEqual(snapshot["storage"]["final_saves"], len(FakeStorage.finals))
+        self.assertEqual(snapshot["connections"]["errors"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,4 +1,6 @@
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timezone
 from pathlib import Path
 import re
@@ -8,7 +10,7 @@ import wave
 import g711
 import numpy as np
 
-from core.config import settings
+from core.config import Settings, settings
 
 
 def is_debug_audio_enabled() -> bool:
@@ -16,6 +18,24 @@ def is_debug_audio_enabled() -> bool:
     return settings.LOG_LEVEL.strip().upper() == "DEBUG"
 
 
+def create_audio_executor(runtime_settings: Settings = settings) -> ThreadPoolExecutor:
+    """Create the shared audio preprocessing thread pool from settings.
+
+    Audio decoding and resampling run here instead of the loop's default
+    executor, so DSP concurrency stays bounded and does not compete with
+    other blocking work submitted to the default pool.
+    """
+    executor = ThreadPoolExecutor(
+        max_workers=runtime_settings.AUDIO_PROCESSING_WORKERS,
+        thread_name_prefix="audio-dsp",
+    )
+    logging.info(
+        "Audio processing executor initialized. workers=%s",
+        runtime_settings.AUDIO_PROCESSING_WORKERS,
+    )
+    return executor
+
+
 def _sanitize_file_component(value: str) -> str:
     """Convert arbitrary session IDs into safe filename components.
 
@@ -155,7 +175,148 @@ def _as_float32_mono_contiguous(samples: np.ndarray) -> np.ndarray:
     return np.ascontiguousarray(sample_array, dtype=np.float32)
 
 
+def _design_upsample_taps(half_taps: int = 8, beta: float = 5.0) -> np.ndarray:
+    """Design the odd-phase branch of a 2x polyphase interpolation filter.
+
+    Args:
+        half_taps: Input samples used on each side of the interpolated point.
+        beta: Kaiser window shape parameter.
+
+    Returns:
+        ``2 * half_taps`` float32 taps at offsets ``-half_taps + 0.5`` through
+        ``half_taps - 0.5``, normalized to unity DC gain.
+    """
+    offsets = np.arange(-half_taps, half_taps) + 0.5
+    window = np.kaiser(4 * half_taps + 1, beta)[1::2]
+    taps = np.sinc(offsets) * window
+    return (taps / taps.sum()).astype(np.float32)
+
+
+# Wire format for pcm16le input, explicit so big-endian hosts decode it too.
+_PCM16LE = np.dtype("<i2")
+
+_UPSAMPLE_HALF_TAPS = 8
+_UPSAMPLE_TAPS = _design_upsample_taps(_UPSAMPLE_HALF_TAPS)
+# Padding before the first sample so the filter's first window is centred on it.
+_UPSAMPLE_LEAD = _UPSAMPLE_HALF_TAPS - 1
+# Input samples spanned by one filter window, centre sample included.
+_UPSAMPLE_SPAN = 2 * _UPSAMPLE_HALF_TAPS
+
+
+@dataclass(slots=True)
+class ResampleState:
+    """Input one connection's upsampler carries from one chunk to the next.
+
+    ``tail`` holds the trailing input samples whose filter windows still
+    reach into the next chunk, or ``None`` before the first chunk.
+    """
+    tail: np.ndarray | None = None
+
+
+def _build_g711_decode_lut(decoder) -> np.ndarray:
+    """Decode all 256 G.711 codes into a normalized float32 lookup table.
+
+    Args:
+        decoder: A ``g711.decode_*`` function. Newer versions return float32
+            arrays; older ones return int16 PCM bytes.
+
+    Returns:
+        A 256-entry float32 array indexed by the encoded byte value.
+    """
+    decoded = decoder(bytes(range(256)))
+    if isinstance(decoded, np.ndarray):
+        table = decoded.astype(np.float32)
+    else:
+        table = np.frombuffer(decoded, dtype=np.int16).astype(np.float32) / 32768.0
+    return _as_float32_mono_contiguous(table)
+
+
+def _new_upsample_buffer(size: int) -> np.ndarray:
+    """Allocate a float32 buffer for ``size`` samples plus filter padding.
+
+    Samples go at ``[_UPSAMPLE_LEAD:_UPSAMPLE_LEAD + size]``.
+    """
+    return np.empty(size + 2 * _UPSAMPLE_HALF_TAPS - 1, dtype=np.float32)
+
+
+def _upsample_2x_padded(padded: np.ndarray, size: int) -> np.ndarray:
+    """Upsample samples already placed in an upsample buffer by 2x.
+
+    The padding is filled by repeating the edge samples, then even outputs
+    take the samples and odd outputs the interpolation branch.
+
+    Args:
+        padded: Buffer from ``_new_upsample_buffer(size)`` holding the samples.
+        size: Number of input samples.
+
+    Returns:
+        ``2 * size`` float32 samples.
+    """
+    samples = padded[_UPSAMPLE_LEAD:_UPSAMPLE_LEAD + size]
+    padded[:_UPSAMPLE_LEAD] = samples[0]
+    padded[_UPSAMPLE_LEAD + size:] = samples[-1]
+
+    result = np.empty(size * 2, dtype=np.float32)
+    result[0::2] = samples
+    result[1::2] = np.correlate(padded, _UPSAMPLE_TAPS, mode="valid")
+    return result
+
+
+def _new_continued_upsample_buffer(state: ResampleState, size: int) -> tuple[np.ndarray, int]:
+    """Allocate a float32 buffer holding ``state.tail`` and room for ``size`` samples.
+
+    Returns:
+        The buffer and the offset at which the new samples go.
+    """
+    tail = state.tail
+    offset = _UPSAMPLE_LEAD if tail is None else tail.size
+    buffer = np.empty(offset + size, dtype=np.float32)
+    if tail is not None:
+        buffer[:offset] = tail
+    return buffer, offset
+
+
+def _upsample_2x_continued(buffer: np.ndarray, state: ResampleState) -> np.ndarray:
+    """Upsample by 2x, continuing from the previous chunk instead of padding.
+
+    Only samples whose filter window is complete are emitted; the rest are
+    kept in ``state`` for the next chunk. Output therefore lags input by
+    ``_UPSAMPLE_HALF_TAPS`` samples, and the concatenated output of a chunked
+    stream matches upsampling the whole signal at once.
+
+    Args:
+        buffer: Buffer from ``_new_continued_upsample_buffer`` with the new
+            samples written at its offset.
+        state: The connection's resampler state, updated in place.
+
+    Returns:
+        Twice as many float32 samples as were emitted.
+    """
+    if state.tail is None:
+        # The stream's first sample is repeated before it, as for a whole signal.
+        buffer[:_UPSAMPLE_LEAD] = buffer[_UPSAMPLE_LEAD]
+
+    count = max(0, buffer.size - _UPSAMPLE_SPAN + 1)
+    state.tail = buffer[count:].copy()
+    result = np.empty(count * 2, dtype=np.float32)
+    if count:
+        result[0::2] = buffer[_UPSAMPLE_LEAD:_UPSAMPLE_LEAD + count]
+        result[1::2] = np.correlate(buffer, _UPSAMPLE_TAPS, mode="valid")
+    return result
+
+
 class AudioProcessor:
+    # Fixed attribute set: slot descriptors instead of an instance dict for the
+    # attributes read on every chunk.
+    __slots__ = (
+        "target_rate",
+        "input_format",
+        "source_rate",
+        "_debug",
+        "_decode_lut",
+        "_decoder_name",
+    )
+
     def __init__(self):
         # Target sample rate
         self.target_rate = 16000
@@ -177,9 +338,13 @@ class AudioProcessor:
                 "Supported: 8000 or 16000"
             )
 
-        # Resolve decoder function once to avoid dynamic lookup in the hot loop.
+        # Per-chunk timing and debug logs are only worth their cost at DEBUG;
+        # resolved once so the hot path skips perf_counter calls otherwise.
+        self._debug = logging.getLogger().isEnabledFor(logging.DEBUG)
+
+        # Decode every G.711 code once so the hot loop is a single table gather.
         # Default to A-law if not PCM16LE or Mu-law, matching original behavior.
-        self._decoder = None
+        self._decode_lut = None
         self._decoder_name = ""
         if self.input_format != "pcm16le":
             if self.input_format == "ulaw":
@@ -187,51 +352,62 @@ class AudioProcessor:
             else:
                 self._decoder_name = "decode_alaw"
 
-            self._decoder = getattr(g711, self._decoder_name, None)
-            if self._decoder is None:
+            decoder = getattr(g711, self._decoder_name, None)
+            if decoder is None:
                 raise RuntimeError(
                     f"g711.{self._decoder_name} is not available. "
                     "Please update the g711 package."
                 )
+            self._decode_lut = _build_g711_decode_lut(decoder)
 
     def _decode_g711(self, data: bytes) -> np.ndarray:
-        """Decodes G.711 bytes to PCM (int16 or float32).
+        """Decodes G.711 bytes to normalized float32 PCM.
 
         Args:
             data (bytes): The input G.711 encoded audio bytes.
 
         Returns:
-            np.ndarray: A numpy array of int16 PCM data or float32 data.
+            np.ndarray: A float32 array in the [-1, 1] range.
         """
-        start_time = time.perf_counter()
-
-        # g711.decode_* returns bytes representing int16 PCM (in older versions)
-        # or a numpy array of float32 (in newer versions like 1.6.5)
-        decoded = self._decoder(data)
-
-        if isinstance(decoded, np.ndarray):
-            result = decoded
-        else:
-            # Convert bytes to numpy array of int16
-            result = np.frombuffer(decoded, dtype=np.int16)
-
-        duration = time.perf_counter() - start_time
-        logging.debug(
-            f"[Audio] {self._decoder_name} took {duration:.6f}s. "
-            f"Output shape: {result.shape}, dtype: {result.dtype}"
-        )
+        if self._debug:
+            start_time = time.perf_counter()
+
+        result = self._decode_lut[np.frombuffer(data, dtype=np.uint8)]
+
+        if self._debug:
+            duration = time.perf_counter() - start_time
+            logging.debug(
+                "[Audio] %s took %.6fs. Output shape: %s, dtype: %s",
+                self._decoder_name,
+                duration,
+                result.shape,
+                result.dtype,
+            )
         return result
 
-    def resample(self, pcm_data: np.ndarray) -> np.ndarray:
-        """Resamples source_rate PCM data to target_rate using linear interpolation.
+    def resample(
+        self,
+        pcm_data: np.ndarray,
+        state: ResampleState | None = None,
+    ) -> np.ndarray:
+        """Resamples source_rate PCM data to target_rate with a polyphase FIR.
+
+        Sources are 8 kHz or 16 kHz, so the only conversion is a 2x upsample.
+        Even output samples are the input samples; odd ones are interpolated
+        halfway between neighbours by a windowed-sinc branch. With ``state``,
+        each chunk continues the filter from the previous one, at a delay of
+        8 input samples; without it, the chunk is filtered on its own with
+        edge samples repeated past each end.
 
         Args:
             pcm_data (np.ndarray): The input PCM data as a numpy array of float32.
+            state (ResampleState | None): The connection's resampler state.
 
         Returns:
             np.ndarray: The resampled waveform as a float32 array.
         """
-        start_time = time.perf_counter()
+        if self._debug:
+            start_time = time.perf_counter()
         pcm_samples = _as_float32_mono_contiguous(pcm_data)
         if pcm_samples.size == 0:
             return pcm_samples
@@ -239,55 +415,87 @@ class AudioProcessor:
         if self.source_rate == self.target_rate:
             return pcm_samples
 
-        duration_sec = len(pcm_samples) / self.source_rate
-        target_len = int(duration_sec * self.target_rate)
-
-        # Create time points for input and output
-        x_old = np.linspace(0, duration_sec, len(pcm_samples))
-        x_new = np.linspace(0, duration_sec, target_len)
-        
-        # Linear interpolation
-        resampled = np.interp(x_new, x_old, pcm_samples)
-        
-        result = _as_float32_mono_contiguous(resampled)
+        if state is not None:
+            buffer, offset = _new_continued_upsample_buffer(state, pcm_samples.size)
+            buffer[offset:] = pcm_samples
+            result = _upsample_2x_continued(buffer, state)
+        else:
+            padded = _new_upsample_buffer(pcm_samples.size)
+            padded[_UPSAMPLE_LEAD:_UPSAMPLE_LEAD + pcm_samples.size] = pcm_samples
+            result = _upsample_2x_padded(padded, pcm_samples.size)
 
-        duration = time.perf_counter() - start_time
-        logging.debug(f"[Audio] resample took {duration:.6f}s. New shape: {result.shape}")
+        if self._debug:
+            duration = time.perf_counter() - start_time
+            logging.debug("[Audio] resample took %.6fs. New shape: %s", duration, result.shape)
         return result
 
-    def process(self, chunk: bytes) -> np.ndarray:
+    def process(self, chunk: bytes, state: ResampleState | None = None) -> np.ndarray:
         """Full pipeline: Decode (G.711/PCM) -> Normalize -> Resample.
 
         Args:
             chunk (bytes): The input audio chunk.
+            state (ResampleState | None): The connection's resampler state, so
+                8 kHz audio is resampled without seams between chunks.
 
         Returns:
             np.ndarray: A Float32 array normalized to the [-1, 1] range.
         """
-        process_start = time.perf_counter()
         input_len = len(chunk)
-        logging.debug(f"[Audio] Processing chunk of size {input_len} bytes, fmt={self.input_format}")
+        if self._debug:
+            process_start = time.perf_counter()
+            logging.debug(
+                "[Audio] Processing chunk of size %d bytes, fmt=%s",
+                input_len,
+                self.input_format,
+            )
 
         # 1. Decode / Load
         if self.input_format == "pcm16le":
-            if input_len % np.dtype(np.int16).itemsize != 0:
+            if input_len % _PCM16LE.itemsize != 0:
                 raise ValueError("PCM16LE chunks must contain an even number of bytes.")
 
-            # Input is raw Int16 PCM bytes
-            pcm_data = np.frombuffer(chunk, dtype=np.int16)
+            # Input is raw little-endian Int16 PCM bytes. frombuffer aliases
+            # the chunk; the float32 copy below is the first owned array.
+            pcm_data = np.frombuffer(chunk, dtype=_PCM16LE)
+
+            # 2. Normalize to [-1, 1]
+            # One float32 copy, then an in-place scale by the (exact) reciprocal.
+            pcm_data = pcm_data.astype(np.float32)
+            pcm_data *= 1.0 / 32768.0
+        elif self.source_rate != self.target_rate and input_len:
+            # G.711 at 8 kHz: gather straight into the upsampler's padded
+            # buffer, so decode, normalize and resample share one array.
+            codes = np.frombuffer(chunk, dtype=np.uint8)
+            if state is not None:
+                buffer, offset = _new_continued_upsample_buffer(state, input_len)
+                np.take(self._decode_lut, codes, out=buffer[offset:])
+                result = _upsample_2x_continued(buffer, state)
+            else:
+                padded = _new_upsample_buffer(input_len)
+                np.take(
+                    self._decode_lut,
+                    codes,
+                    out=padded[_UPSAMPLE_LEAD:_UPSAMPLE_LEAD + input_len],
+                )
+                result = _upsample_2x_padded(padded, input_len)
+            if self._debug:
+                process_duration = time.perf_counter() - process_start
+                logging.debug("[Audio] Total process took %.6fs", process_duration)
+            return result
         else:
-            # G.711 mu-law or A-law
+            # G.711 mu-law or A-law. The table gather returns an owned,
+            # already-normalized float32 array.
             pcm_data = self._decode_g711(chunk)
 
-        # 2. Normalize to [-1, 1]
-        # Whether from G.711 decode (if int16) or direct PCM16 load, we normalise here.
-        if pcm_data.dtype == np.int16:
-            pcm_data = pcm_data.astype(np.float32) / 32768.0
-
-        # 3. Resample
-        result = self.resample(pcm_data)
+        # 3. Resample. Decoded data is already flat float32, so input at the
+        # target rate is returned as is.
+        if self.source_rate == self.target_rate:
+            result = pcm_data
+        else:
+            result = self.resample(pcm_data, state)
 
-        process_duration = time.perf_counter() - process_start
-        logging.debug(f"[Audio] Total process took {process_duration:.6f}s")
+        if self._debug:
+            process_duration = time.perf_counter() - process_start
+            logging.debug("[Audio] Total process took %.6fs", process_duration)
 
-        return _as_float32_mono_contiguous(result)
+        return result
@@ -5,9 +5,12 @@ import logging
 import time
 import contextvars
 import threading
+from collections import deque
 from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
 from pathlib import Path
-from typing import Callable, Tuple, Any, TypeVar
+from typing import Any, Callable, Tuple, TypeVar
 
 from core.config import PROJECT_ROOT, Settings, settings
 
@@ -203,6 +206,109 @@ def create_inference_executor(runtime_settings: Settings = settings) -> BoundedI
     return executor
 
 
+@dataclass(slots=True)
+class _DecodeRequest:
+    """One caller's stream in a :class:`StreamBatchDecoder`."""
+    stream: Any
+    wakeup: threading.Event = field(default_factory=threading.Event)
+    lead: bool = False
+    finished: bool = False
+    error: Exception | None = None
+
+
+class StreamBatchDecoder:
+    """Decode streams from concurrent sessions together with ``decode_streams``.
+
+    Inference workers call :meth:`decode` from their threads. Up to
+    ``max_batches`` callers lead at once, each decoding its own stream in
+    parallel with the others. Once every leader slot is taken, further callers
+    wait; the next leader takes every waiting stream and decodes their ready
+    frames with one ``decode_streams`` call per step. When a leader's batch is
+    done it hands its slot to the oldest waiting caller, so no session keeps
+    decoding on behalf of others indefinitely.
+
+    Batches can never exceed the number of inference workers, because each
+    waiting caller holds a worker thread.
+    """
+
+    def __init__(
+        self,
+        recognizer: sherpa_onnx.OnlineRecognizer,
+        max_batches: int = 1,
+    ) -> None:
+        """Initialize the decoder.
+
+        Args:
+            recognizer: Recognizer shared by every session's stream.
+            max_batches: Batches allowed to decode in parallel.
+        """
+        self.recognizer = recognizer
+        self.max_batches = max_batches
+        self._lock = threading.Lock()
+        self._waiting: deque[_DecodeRequest] = deque()
+        self._leaders = 0
+
+    def decode(self, stream: Any) -> None:
+        """Decode all ready frames of ``stream``, blocking until done.
+
+        Args:
+            stream: A stream created by the shared recognizer.
+
+        Raises:
+            Exception: The error raised by the batch that decoded ``stream``.
+        """
+        request = _DecodeRequest(stream)
+        with self._lock:
+            if self._leaders < self.max_batches:
+                self._leaders += 1
+                request.lead = True
+            else:
+                self._waiting.append(request)
+
+        if not request.lead:
+            request.wakeup.wait()
+        if request.lead:
+            self._lead(request)
+        if request.error is not None:
+            raise request.error
+
+    def _lead(self, own: _DecodeRequest) -> None:
+        """Decode ``own`` with every waiting stream, then pass the slot on."""
+        batch = [own]
+        try:
+            with self._lock:
+                batch.extend(self._waiting)
+                self._waiting.clear()
+            self._decode_batch(batch)
+        finally:
+            # Also runs when decoding raises a BaseException, so an
+            # interrupted leader never strands the callers behind it.
+            with self._lock:
+                if self._waiting:
+                    successor = self._waiting.popleft()
+                    successor.lead = True
+                    successor.wakeup.set()
+                else:
+                    self._leaders -= 1
+            for request in batch:
+                if not request.finished:
+                    request.error = RuntimeError("Stream decode was interrupted.")
+                    request.finished = True
+                request.wakeup.set()
+
+    def _decode_batch(self, batch: list[_DecodeRequest]) -> None:
+        """Decode ready frames for a batch, recording any error per request."""
+        streams = [request.stream for request in batch]
+        try:
+            while ready := [s for s in streams if self.recognizer.is_ready(s)]:
+                self.recognizer.decode_streams(ready)
+        except Exception as exc:
+            for request in batch:
+                request.error = exc
+        for request in batch:
+            request.finished = True
+
+
 def resolve_model_dir(raw_path: str | Path) -> Path:
     """Resolve a configured model path.
 
@@ -258,7 +364,7 @@ def load_model(model_path: str | Path | None = None) -> sherpa_onnx.OnlineRecogn
         tokens=str(tokens),
         encoder=str(encoder),
         decoder=str(decoder),
-        num_threads=4,
+        num_threads=settings.ASR_MODEL_NUM_THREADS,
         sample_rate=16000,
         feature_dim=80,
         decoding_method="greedy_search",
@@ -277,71 +383,87 @@ class ASRInferenceService:
         self,
         recognizer: sherpa_onnx.OnlineRecognizer,
         inference_executor: BoundedInferenceExecutor,
+        stream_decoder: StreamBatchDecoder | None = None,
     ):
         self.recognizer = recognizer
         self.stream = self.recognizer.create_stream()
         self.inference_executor = inference_executor
+        # Share one decoder across sessions so their decodes are batched.
+        self.stream_decoder = stream_decoder or StreamBatchDecoder(recognizer)
+        # A service belongs to one connection and runs one chunk at a time, so
+        # a single snapshot of the correlation IDs is reused for every call.
+        self._context = contextvars.copy_context()
 
-    async def infer(self, audio_input: Any) -> Tuple[str, bool]:
+    def _infer_blocking(self, samples: np.ndarray) -> Tuple[str, bool, float]:
+        """Feeds one chunk to the stream and decodes it on an inference worker.
+
+        Args:
+            samples (np.ndarray): Flat float32 samples at 16 kHz.
+
+        Returns:
+            Tuple[str, bool, float]: The current text, whether an endpoint was
+                reached, and the time spent in this call.
+        """
+        block_start = time.perf_counter()
+        self.stream.accept_waveform(16000, samples)
+
+        # Decode, batched with other sessions' ready streams
+        self.stream_decoder.decode(self.stream)
+
+        text = self.recognizer.get_result(self.stream)
+        is_endpoint = self.recognizer.is_endpoint(self.stream)
+
+        if is_endpoint:
+            self.recognizer.reset(self.stream)
+
+        block_duration = time.perf_counter() - block_start
+        return text, is_endpoint, block_duration
+
+    async def infer(self, audio_input: np.ndarray) -> Tuple[str, bool]:
         """Runs inference on the provided audio chunk.
 
         Args:
-            audio_input (Any): The prepared audio samples (numpy array or tensor).
-                               Examples: np.ndarray (float32), torch.Tensor.
-                               Expected shape: (N,) or (1, N).
+            audio_input (np.ndarray): The prepared audio samples, as returned by
+                               ``AudioProcessor.process``: float32, 1-D and
+                               C-contiguous. Other shapes and dtypes are
+                               converted with one copy.
 
         Returns:
             Tuple[str, bool]: A tuple containing:
                 - text (str): The transcribed text (partial or final).
                 - is_final (bool): Whether the segment is considered complete.
+
+        Raises:
+            ValueError: If ``audio_input`` is not a numpy array.
         """
         start_time = time.perf_counter()
 
-        # Input validation / conversion
-        if hasattr(audio_input, "numpy"):
-            samples = audio_input.numpy()
-        elif isinstance(audio_input, np.ndarray):
-            samples = audio_input
-        else:
-            # Fallback/Error - assuming it might be a list or bytes if not careful
-            # But AudioProcessor returns torch.Tensor
+        if not isinstance(audio_input, np.ndarray):
             raise ValueError(f"Unsupported audio input type: {type(audio_input)}")
-            
+        samples = audio_input
+
         # Ensure flat float32 array
-        # Optimization: Avoid copy if already flat float32
+        # Optimization: Avoid copy if already flat float32, and convert other
+        # inputs with a single copy rather than flatten() followed by astype().
         if samples.dtype != np.float32 or samples.ndim != 1 or not samples.flags["C_CONTIGUOUS"]:
-            samples = samples.flatten().astype(np.float32)
+            samples = np.ascontiguousarray(samples, dtype=np.float32).reshape(-1)
         sample_count = len(samples)
 
-        def _blocking_infer():
-            block_start = time.perf_counter()
-            self.stream.accept_waveform(16000, samples)
-            
-            # Decode
-            while self.recognizer.is_ready(self.stream):
-                self.recognizer.decode_stream(self.stream)
-            
-            text = self.recognizer.get_result(self.stream)
-            is_endpoint = self.recognizer.is_endpoint(self.stream)
-
-            if is_endpoint:
-                self.recognizer.reset(self.stream)
-            
-            block_duration = time.perf_counter() - block_start
-            return text, is_endpoint, block_duration
-
         # Run CPU-bound generation in a separate thread with context propagation
-        ctx = contextvars.copy_context()
         text, is_final, cpu_duration = await self.inference_executor.run(
-            lambda: ctx.run(_blocking_infer)
+            partial(self._context.run, self._infer_blocking, samples)
         )
 
         total_duration = time.perf_counter() - start_time
 
         logging.debug(
-            f"[Inference] Samples: {sample_count}, "
-            f"CPU Time: {cpu_duration:.6f}s, Total Time: {total_duration:.6f}s. "
-            f"Result: {'FINAL' if is_final else 'PARTIAL'}, TextLen: {len(text)}"
+            "[Inference] Samples: %d, CPU Time: %.6fs, Total Time: %.6fs. "
+            "Result: %s, TextLen: %d",
+            sample_count,
+            cpu_duration,
+            total_duration,
+            "FINAL" if is_final else "PARTIAL",
+            len(text),
         )
         
         return text.strip(), is_final
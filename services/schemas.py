@@ -1,12 +1,16 @@
 from datetime import datetime
 import uuid
-from sqlalchemy import String, Integer, Text, DateTime, Index, ForeignKey, UniqueConstraint
-from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
+from sqlalchemy import String, Integer, Text, DateTime, ForeignKey, UniqueConstraint, func
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 from sqlalchemy.ext.asyncio import AsyncAttrs
 
 
 class Base(AsyncAttrs, DeclarativeBase):
-    """Base class for SQLAlchemy models using AsyncAttrs."""
+    """Base class for SQLAlchemy models using AsyncAttrs.
+
+    ``created_at`` columns default to ``UTC_TIMESTAMP()`` rendered into the
+    INSERT itself, so MySQL stamps rows without a Python-side datetime.
+    """
     pass
 
 
@@ -22,7 +26,7 @@ class Session(Base):
 
     id: Mapped[str] = mapped_column(String(64), primary_key=True)
     user_id: Mapped[str] = mapped_column(String(64), nullable=False)
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=func.utc_timestamp())
 
 
 class Segment(Base):
@@ -41,10 +45,11 @@ class Segment(Base):
     session_id: Mapped[str] = mapped_column(String(64), ForeignKey("sessions.id"), nullable=False)
     segment_seq: Mapped[int] = mapped_column(Integer, nullable=False)
     content: Mapped[str] = mapped_column(Text, nullable=False)
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=func.utc_timestamp())
 
-    # Compound index for efficient retrieval of segments by session
+    # The unique key doubles as the lookup index for per-session reads
+    # (MAX(segment_seq), ordered listing) and for the session foreign key, so
+    # inserts maintain one (session_id, segment_seq) B-tree rather than two.
     __table_args__ = (
-        Index("idx_session_seq", "session_id", "segment_seq"),
         UniqueConstraint("session_id", "segment_seq", name="uq_segments_session_seq"),
     )
@@ -1,42 +1,81 @@
 from dataclasses import dataclass
-from datetime import datetime, timezone
 import uuid
-import asyncio
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 import logging
 import time
 from typing import Dict
-from sqlalchemy import func, select, text
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.dialects.mysql import Insert as MySQLInsert, insert as mysql_insert
+from sqlalchemy.exc import IntegrityError
 from core.config import settings
 from services.schemas import Segment, Session
 
 # Database Setup
-engine = create_async_engine(settings.MYSQL_DATABASE_URL, echo=False)
+# Pooled connections are recycled before MySQL or an intermediate proxy drops
+# them for idleness, without paying a ping round-trip on every checkout. The
+# pool keeps enough warm connections for concurrent sessions and allows a
+# bounded burst beyond that, so finals rarely wait on a TCP/auth handshake.
+engine = create_async_engine(
+    settings.MYSQL_DATABASE_URL,
+    echo=False,
+    pool_size=settings.MYSQL_POOL_SIZE,
+    max_overflow=settings.MYSQL_MAX_OVERFLOW,
+    pool_timeout=settings.MYSQL_POOL_TIMEOUT_SECONDS,
+    pool_recycle=settings.MYSQL_POOL_RECYCLE_SECONDS,
+    connect_args={"connect_timeout": settings.MYSQL_CONNECT_TIMEOUT_SECONDS},
+)
 AsyncSessionLocal = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
-@dataclass
+@dataclass(slots=True)
 class PartialEntry:
-    """In-memory partial transcription entry."""
+    """In-memory partial transcription entry.
+
+    ``ts`` is the Unix time of the save, stored as a float so the partial path
+    does not format a timestamp string per frame. Slots keep each cached
+    entry to its four fields, without a per-instance dict.
+    """
     content: str
     seq: int
-    ts_iso: str
+    ts: float
     expires_at: float
 
 
 _PARTIAL_TTL_SECONDS = 300.0
+_PARTIAL_SWEEP_INTERVAL_SECONDS = 30.0
 _SEQ_BY_SESSION: Dict[str, int] = {}
 _PARTIAL_BY_SESSION: Dict[str, PartialEntry] = {}
-_CACHE_LOCK: asyncio.Lock | None = None
+# Sessions already upserted by this process, oldest first. Bounded so that a
+# long-running worker does not accumulate every session id it has ever seen.
+_ENSURED_SESSIONS_MAX = 10_000
+_ENSURED_SESSIONS: Dict[str, None] = {}
+_next_partial_sweep_at = 0.0
+
+
+def _mark_session_ensured(session_id: str) -> None:
+    _ENSURED_SESSIONS[session_id] = None
+    if len(_ENSURED_SESSIONS) > _ENSURED_SESSIONS_MAX:
+        del _ENSURED_SESSIONS[next(iter(_ENSURED_SESSIONS))]
 
 
-def _get_cache_lock() -> asyncio.Lock:
-    global _CACHE_LOCK
-    if _CACHE_LOCK is None:
-        _CACHE_LOCK = asyncio.Lock()
-    return _CACHE_LOCK
+def _session_upsert(session_id: str, user_id: str) -> MySQLInsert:
+    """Build an idempotent insert for a session row.
+
+    ``INSERT ... ON DUPLICATE KEY UPDATE`` leaves an existing row untouched,
+    so two connections creating the same session cannot race into a
+    duplicate-key error or a gap-lock deadlock.
+    """
+    statement = mysql_insert(Session).values(id=session_id, user_id=user_id)
+    return statement.on_duplicate_key_update(id=statement.inserted.id)
 
 
 def _cleanup_expired_partials(now: float) -> None:
+    # Sweeping scans every session, so run it at most once per interval
+    # instead of on every partial save.
+    global _next_partial_sweep_at
+    if now < _next_partial_sweep_at:
+        return
+    _next_partial_sweep_at = now + _PARTIAL_SWEEP_INTERVAL_SECONDS
+
     expired_sessions = [
         session_id
         for session_id, entry in _PARTIAL_BY_SESSION.items()
@@ -68,65 +107,56 @@ class StorageManager:
     async def ensure_session_exists(self, user_id: str = "anonymous"):
         """Ensures the session exists in the database. If not, creates it.
 
+        Uses ``INSERT ... ON DUPLICATE KEY UPDATE`` so an existing row is left
+        untouched. Sessions this process has already ensured return without
+        touching the database.
+
         Args:
             user_id (str): The user ID associated with the session. Defaults to "anonymous".
         """
+        if self.session_id in _ENSURED_SESSIONS:
+            logging.debug("[Storage] Session already ensured: %s", self.session_id)
+            return
+
+        start_time = time.perf_counter()
         async with AsyncSessionLocal() as session:
             async with session.begin():
-                start_time = time.perf_counter()
-                result = await session.execute(select(Session).where(Session.id == self.session_id))
-                existing_session = result.scalar_one_or_none()
-
-                if not existing_session:
-                    new_session = Session(
-                        id=self.session_id,
-                        user_id=user_id,
-                        created_at=datetime.now(timezone.utc)
-                    )
-                    session.add(new_session)
-                    logging.info(f"Created new session: {self.session_id}")
-                else:
-                    logging.debug(f"Found existing session: {self.session_id}")
-
-                duration = time.perf_counter() - start_time
-                logging.debug(f"[Storage] ensure_session_exists took {duration:.6f}s")
+                await session.execute(_session_upsert(self.session_id, user_id))
+        _mark_session_ensured(self.session_id)
 
+        duration = time.perf_counter() - start_time
+        logging.debug(
+            "[Storage] ensure_session_exists upsert took %.6fs. Session: %s",
+            duration,
+            self.session_id,
+        )
 
     async def get_next_sequence(self) -> int:
         """Atomically increments the sequence counter for this session in memory.
 
+        The read-modify-write contains no await, so it is atomic on the event
+        loop without a lock.
+
         Returns:
             int: The new sequence number.
         """
-        start_time = time.perf_counter()
-        async with _get_cache_lock():
-            current = _SEQ_BY_SESSION.get(self.session_id, 0) + 1
-            _SEQ_BY_SESSION[self.session_id] = current
-            res = current
-        duration = time.perf_counter() - start_time
-        logging.debug(f"[Storage] Memory INCR took {duration:.6f}s. New Seq: {res}")
-        return res
+        current = _SEQ_BY_SESSION.get(self.session_id, 0) + 1
+        _SEQ_BY_SESSION[self.session_id] = current
+        logging.debug("[Storage] Memory INCR. New Seq: %d", current)
+        return current
 
     async def get_current_sequence(self) -> int:
         """Gets the current sequence counter for this session.
 
-        In-memory state is used as the hot path. When the process has restarted
-        or the session is otherwise missing from memory, the counter is restored
-        from the current database maximum so partial sequence numbers continue
-        after persisted final segments.
+        Called once per connection. The counter is seeded from the larger of
+        the in-memory value and the database maximum, so a reconnect served
+        by another worker, or a worker whose cache went stale while another
+        one saved finals, continues after every persisted segment.
 
         Returns:
             int: The current sequence number.
         """
         start_time = time.perf_counter()
-        async with _get_cache_lock():
-            cached = _SEQ_BY_SESSION.get(self.session_id)
-            if cached is not None:
-                duration = time.perf_counter() - start_time
-                logging.debug(
-                    f"[Storage] Memory GET took {duration:.6f}s. Current Seq: {cached}"
-                )
-                return cached
 
         async with AsyncSessionLocal() as session:
             result = await session.execute(
@@ -135,98 +165,147 @@ class StorageManager:
             )
             max_seq = result.scalar_one()
 
-        restored = max_seq or 0
-        async with _get_cache_lock():
-            current = max(_SEQ_BY_SESSION.get(self.session_id, 0), restored)
-            _SEQ_BY_SESSION[self.session_id] = current
+        # A final saved while the query was in flight may have moved the
+        # counter past the restored maximum; keep whichever is newer.
+        current = max(_SEQ_BY_SESSION.get(self.session_id, 0), max_seq or 0)
+        _SEQ_BY_SESSION[self.session_id] = current
 
         duration = time.perf_counter() - start_time
         logging.debug(
-            f"[Storage] Sequence restore took {duration:.6f}s. Current Seq: {current}"
+            "[Storage] Sequence seed took %.6fs. Current Seq: %d", duration, current
         )
         return current
 
     async def save_partial(self, text: str, seq: int):
         """Saves the partial draft to in-memory cache.
 
-        Key: asr:sess:{id}:current
+        Key: session id
         TTL: 300 seconds
 
         Args:
             text (str): The partial transcription text.
             seq (int): The current sequence number.
         """
-        start_time = time.perf_counter()
         now = time.monotonic()
-        entry = PartialEntry(
+        # Sweep and store in one synchronous step: no lock or await per partial.
+        _cleanup_expired_partials(now)
+        _PARTIAL_BY_SESSION[self.session_id] = PartialEntry(
             content=text,
             seq=seq,
-            ts_iso=datetime.now(timezone.utc).isoformat(),
+            ts=time.time(),
             expires_at=now + _PARTIAL_TTL_SECONDS
         )
-        async with _get_cache_lock():
-            _cleanup_expired_partials(now)
-            _PARTIAL_BY_SESSION[self.session_id] = entry
-
-        duration = time.perf_counter() - start_time
-        logging.debug(f"[Storage] save_partial (Memory) took {duration:.6f}s")
-
-    async def save_final(self, text: str) -> Segment:
+        logging.debug("[Storage] save_partial (Memory). Seq: %d", seq)
+
+    async def save_final(
+        self,
+        text: str,
+        user_id: str = "anonymous",
+        seq: int | None = None,
+    ) -> Segment:
         """Persists the final segment to MySQL and clears the cached draft.
 
-        The segment is inserted inside a database transaction before this
-        method returns. Sequence allocation is based on the current database
-        maximum while holding a row lock on the parent session.
+        The parent session upsert, sequence allocation, and segment insert are
+        issued inside a single database transaction before this method
+        returns, so a final costs one transaction rather than one per step.
+        Sessions this process has already ensured skip the upsert.
+        Without ``seq``, sequence allocation is based on the current database
+        maximum while holding a row lock on the parent session. A ``seq``
+        reserved earlier with ``get_next_sequence`` is inserted as given; if
+        another worker already stored that sequence, the segment is saved
+        under the next free one instead, so callers must read the stored
+        sequence from the returned segment.
 
         Args:
             text (str): The final transcription text.
+            user_id (str): The user ID recorded if the session row has to be
+                created. Defaults to "anonymous".
+            seq (int | None): A pre-reserved sequence number. Defaults to
+                allocating from the database.
 
         Returns:
-            Segment: The persisted segment object.
+            Segment: A detached copy of the persisted segment row.
+            ``created_at`` is assigned by MySQL and is not loaded back.
         """
-        await self.ensure_session_exists()
-
-        start_time = time.perf_counter()
-        async with AsyncSessionLocal() as session:
-            async with session.begin():
-                result = await session.execute(
-                    select(Session)
-                    .where(Session.id == self.session_id)
-                    .with_for_update()
-                )
-                existing_session = result.scalar_one_or_none()
-                if existing_session is None:
-                    raise RuntimeError(
-                        f"Session {self.session_id} could not be locked for final save"
-                    )
+        # Latency is recorded by the caller in RuntimeMetrics, so this path
+        # takes no timestamps of its own.
+        try:
+            new_segment = await self._insert_final(text, user_id, seq)
+        except IntegrityError:
+            if seq is None:
+                raise
+            logging.warning(
+                "[Storage] Seq %d is already stored for session %s; "
+                "allocating from the database.",
+                seq,
+                self.session_id,
+            )
+            # The conflict may also be a missing parent row that this process
+            # wrongly believes exists, so upsert it again on the retry.
+            _ENSURED_SESSIONS.pop(self.session_id, None)
+            new_segment = await self._insert_final(text, user_id, None)
+        seq = new_segment.segment_seq
+
+        # The draft and counter updates contain no await, so they complete
+        # atomically on the event loop without a lock or a second step. A
+        # draft or reservation for a later sequence, made while this insert
+        # was in flight, is kept.
+        draft = _PARTIAL_BY_SESSION.get(self.session_id)
+        if draft is not None and draft.seq <= seq:
+            del _PARTIAL_BY_SESSION[self.session_id]
+        _SEQ_BY_SESSION[self.session_id] = max(_SEQ_BY_SESSION.get(self.session_id, 0), seq)
+        _mark_session_ensured(self.session_id)
 
-                max_result = await session.execute(
-                    select(func.max(Segment.segment_seq))
-                    .where(Segment.session_id == self.session_id)
-                )
-                max_seq = max_result.scalar_one()
-                seq = (max_seq or 0) + 1
-
-                new_segment = Segment(
-                    id=str(uuid.uuid4()),
-                    session_id=self.session_id,
-                    segment_seq=seq,
-                    content=text,
-                    created_at=datetime.now(timezone.utc)
-                )
-                session.add(new_segment)
-
-        db_duration = time.perf_counter() - start_time
         logging.debug(
-            f"[Storage] Final MySQL insert took {db_duration:.6f}s. "
-            f"Session: {self.session_id}"
+            "[Storage] Final MySQL insert done. Session: %s, Seq: %d",
+            self.session_id,
+            seq,
         )
+        return new_segment
 
-        cache_start = time.perf_counter()
-        async with _get_cache_lock():
-            _PARTIAL_BY_SESSION.pop(self.session_id, None)
-            _SEQ_BY_SESSION[self.session_id] = new_segment.segment_seq
-        cache_duration = time.perf_counter() - cache_start
-        logging.debug(f"[Storage] Final cache update took {cache_duration:.6f}s")
+    async def _insert_final(self, text: str, user_id: str, seq: int | None) -> Segment:
+        """Insert one final segment in a single transaction.
 
-        return new_segment
+        Args:
+            text (str): The final transcription text.
+            user_id (str): The user ID recorded if the session row has to be
+                created.
+            seq (int | None): The sequence to insert, or None to allocate
+                MAX+1 under a lock on the parent session row.
+
+        Returns:
+            Segment: A detached copy of the inserted segment row.
+        """
+        async with AsyncSessionLocal() as session:
+            async with session.begin():
+                # Create the parent row first unless this process already has:
+                # locking a missing row takes a gap lock, and two connections
+                # inserting under gap locks deadlock. Once the row exists, lock
+                # it by key only, and only when allocating the sequence here.
+                if self.session_id not in _ENSURED_SESSIONS:
+                    await session.execute(_session_upsert(self.session_id, user_id))
+                if seq is None:
+                    await session.execute(
+                        select(Session.id)
+                        .where(Session.id == self.session_id)
+                        .with_for_update()
+                    )
+
+                    max_result = await session.execute(
+                        select(func.max(Segment.segment_seq))
+                        .where(Segment.session_id == self.session_id)
+                    )
+                    max_seq = max_result.scalar_one()
+                    seq = (max_seq or 0) + 1
+
+                # A Core INSERT skips the ORM unit-of-work flush for a row
+                # this session never reads back.
+                values = {
+                    "id": str(uuid.uuid4()),
+                    "session_id": self.session_id,
+                    "segment_seq": seq,
+                    "content": text,
+                }
+                await session.execute(insert(Segment).values(**values))
+
+        return Segment(**values)